@@ -24,10 +24,13 @@ import time
 from typing import Annotated, Optional, TypedDict
 
 import httpx
+import orjson
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_openai import ChatOpenAI
 
+from backend.fhir_resources import get_fhir_client
+
 logger = logging.getLogger("ehr_navigator")
 logger.setLevel(logging.INFO)
 if not logger.handlers:
@@ -39,7 +42,6 @@ if not logger.handlers:
 # ─── Configuration ───────────────────────────────────────
 
 LLAMA_SERVER_URL = os.getenv("LLAMA_VISION_URL", "http://localhost:8081")
-FHIR_BASE = os.getenv("FHIR_BASE", "http://localhost:8080/fhir")
 
 FHIR_RESOURCE_TYPES = [
     "Observation",
@@ -51,11 +53,6 @@ FHIR_RESOURCE_TYPES = [
     "DetectedIssue",
 ]
 
-FHIR_HEADERS = {
-    "Accept": "application/fhir+json",
-    "Content-Type": "application/fhir+json",
-}
-
 
 # ─── LLM Setup ───────────────────────────────────────────
 
@@ -111,14 +108,9 @@ def _strip_json_decoration(text: str) -> str:
 
 # ─── FHIR Helpers ────────────────────────────────────────
 
-_fhir_client: Optional[httpx.Client] = None
-
-
 def _get_fhir_client() -> httpx.Client:
-    global _fhir_client
-    if _fhir_client is None:
-        _fhir_client = httpx.Client(base_url=FHIR_BASE, headers=FHIR_HEADERS, timeout=10)
-    return _fhir_client
+    # Share the server-wide pooled client rather than opening a second pool
+    return get_fhir_client().client
 
 
 def get_patient_data_manifest(patient_id: str) -> dict[str, list[str]]:
@@ -612,18 +604,18 @@ async def navigate_ehr_stream(question: str, patient_id: str):
             elif node_name == "synthesize_answer":
                 reasoning_text = "Complete"
 
-            yield json.dumps({
+            yield orjson.dumps({
                 "step": node_name,
                 "label": label,
                 "reasoning": reasoning_text,
-            }) + "\n"
+            }) + b"\n"
 
         # Small yield delay so frontend can process
         await asyncio.sleep(0.05)
 
     elapsed = int((time.time() - start) * 1000)
 
-    yield json.dumps({
+    yield orjson.dumps({
         "step": "done",
         "data": {
             "answer": final_state.get("answer", "No answer generated."),
@@ -632,7 +624,7 @@ async def navigate_ehr_stream(question: str, patient_id: str):
             "facts_extracted": len(final_state.get("facts", [])),
             "processing_time_ms": elapsed,
         },
-    }) + "\n"
+    }) + b"\n"
 
 
 async def navigate_ehr(question: str, patient_id: str) -> dict:
@@ -6,6 +6,7 @@ Concise responses: result first, details on demand.
 """
 
 import os
+import re
 from typing import Optional
 from dataclasses import dataclass
 from neo4j import GraphDatabase
@@ -79,6 +80,19 @@ _DRUG_ALIASES: dict[str, str] = {
     "lovenox": "Enoxaparin",
 }
 
+# Interaction-type keywords that mark an alert as high risk; shared by the
+# interaction summary, the FHIR export and the MCP tools
+HIGH_RISK_KEYWORDS = frozenset([
+    "bleeding", "anticoagulant", "qtc", "serotonergic",
+    "cardiotoxic", "nephrotoxic", "hepatotoxic", "respiratory",
+])
+_HIGH_RISK_RE = re.compile("|".join(map(re.escape, sorted(HIGH_RISK_KEYWORDS))))
+
+
+def is_high_risk_interaction(interaction_type: str) -> bool:
+    """Check if interaction type is high risk."""
+    return _HIGH_RISK_RE.search(interaction_type.lower()) is not None
+
 
 class Neo4jService:
     """Neo4j connection and query service."""
@@ -201,7 +215,7 @@ class Neo4jService:
             )
 
         # Generate concise summary
-        high_risk = [i for i in interactions if self._is_high_risk(i.interaction_type)]
+        high_risk = [i for i in interactions if is_high_risk_interaction(i.interaction_type)]
 
         if high_risk:
             summary = f"⚠️ {len(high_risk)} high-risk interaction(s) found."
@@ -214,14 +228,6 @@ class Neo4jService:
             summary=summary
         )
 
-    def _is_high_risk(self, interaction_type: str) -> bool:
-        """Check if interaction type is high risk."""
-        high_risk_keywords = [
-            'bleeding', 'anticoagulant', 'qtc', 'serotonergic',
-            'cardiotoxic', 'nephrotoxic', 'hepatotoxic', 'respiratory'
-        ]
-        return any(kw in interaction_type.lower() for kw in high_risk_keywords)
-
     def search_drug(self, search_term: str, limit: int = 5) -> list[dict]:
         """Search for drugs by name."""
         with self.driver.session() as session:
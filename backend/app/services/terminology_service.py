@@ -9,6 +9,7 @@ Unified medical terminology lookups:
 
 import os
 import re
+from functools import lru_cache
 from typing import Optional
 from dataclasses import dataclass, field
 
@@ -159,29 +160,33 @@ class SNOMEDClient:
 
     def crosswalk_icd10(self, icd10_code: str) -> Optional[SNOMEDConcept]:
         """Map ICD-10-CM code to SNOMED CT via UMLS crosswalk API."""
+        try:
+            return self._fetch_crosswalk(icd10_code)
+        except Exception:
+            return None  # Graceful degradation
+
+    def _fetch_crosswalk(self, icd10_code: str) -> Optional[SNOMEDConcept]:
+        """Crosswalk lookup that lets network/API errors propagate."""
         if not self.api_key:
             return None
-        try:
-            resp = self._client.get(
-                f"/crosswalk/current/source/ICD10CM/{icd10_code}",
-                params={
-                    "targetSource": "SNOMEDCT_US",
-                    "apiKey": self.api_key,
-                },
+        resp = self._client.get(
+            f"/crosswalk/current/source/ICD10CM/{icd10_code}",
+            params={
+                "targetSource": "SNOMEDCT_US",
+                "apiKey": self.api_key,
+            },
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        results = data.get("result", [])
+        if results:
+            first = results[0]
+            return SNOMEDConcept(
+                cui=first.get("ui", ""),
+                code=first.get("ui", ""),
+                name=first.get("name", ""),
+                semantic_type="SNOMEDCT_US",
             )
-            resp.raise_for_status()
-            data = resp.json()
-            results = data.get("result", [])
-            if results:
-                first = results[0]
-                return SNOMEDConcept(
-                    cui=first.get("ui", ""),
-                    code=first.get("ui", ""),
-                    name=first.get("name", ""),
-                    semantic_type="SNOMEDCT_US",
-                )
-        except Exception:
-            pass  # Graceful degradation
         return None
 
     def close(self):
@@ -279,3 +284,31 @@ def get_snomed() -> SNOMEDClient:
     if _snomed is None:
         _snomed = SNOMEDClient()
     return _snomed
+
+
+# ─── Cached lookups ──────────────────────────────────────
+# RxNorm normalization and ICD-10 → SNOMED crosswalks are deterministic, and
+# the same drugs/codes recur across exports. Failed lookups raise inside the
+# cached function, so transient API errors are never memoized.
+
+@lru_cache(maxsize=4096)
+def _normalize_drug(key: str) -> Optional[RxNormDrug]:
+    return get_rxnorm().normalize(key)
+
+
+@lru_cache(maxsize=4096)
+def _crosswalk_icd10(code: str) -> Optional[SNOMEDConcept]:
+    return get_snomed()._fetch_crosswalk(code)
+
+
+def normalize_drug_cached(drug_name: str) -> Optional[RxNormDrug]:
+    """RxNorm normalize, memoized on the case/whitespace-folded drug name."""
+    return _normalize_drug(drug_name.strip().lower())
+
+
+def crosswalk_icd10_cached(icd10_code: str) -> Optional[SNOMEDConcept]:
+    """ICD-10 → SNOMED crosswalk, memoized per code. Returns None on API errors."""
+    try:
+        return _crosswalk_icd10(icd10_code.strip().upper())
+    except Exception:
+        return None
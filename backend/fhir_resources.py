@@ -18,22 +18,143 @@ FHIR_BASE = os.getenv("FHIR_BASE", "http://localhost:8080/fhir")
 HEADERS = {
     "Content-Type": "application/fhir+json",
     "Accept": "application/fhir+json",
+    "Accept-Encoding": "gzip",
 }
 
+# Keep-alive pool shared by every request through a client; retries=1 only
+# re-attempts failed connects, never a request that reached the server.
+POOL_LIMITS = httpx.Limits(
+    max_connections=32, max_keepalive_connections=32, keepalive_expiry=60,
+)
+
+
+# image_type -> (LOINC code, display) for DiagnosticReport.code
+LOINC_IMAGING_CODES = {
+    "chest_xray": ("36643-5", "XR Chest 2 Views"),
+    "mri": ("24590-2", "MR Brain"),
+    "ct": ("24727-0", "CT study"),
+    "fundoscopy": ("32451-7", "Physical findings of Eye"),
+    "ecg": ("11524-6", "EKG study"),
+    "dermatology": ("72170-4", "Photographic image"),
+    "pathology": ("60567-5", "Pathology Diagnostic study note"),
+    "general": ("18748-4", "Diagnostic imaging study"),
+}
+
+_INTERP_DISPLAY = {
+    "N": "Normal", "H": "High", "L": "Low",
+    "HH": "Critically high", "LL": "Critically low",
+}
+
+
+def build_observation_resource(
+    loinc_code: str,
+    loinc_display: str,
+    value: float,
+    unit: str,
+    reference_low: float | None = None,
+    reference_high: float | None = None,
+    status: str = "final",
+) -> dict:
+    """Build a lab Observation body (no subject/encounter/effectiveDateTime).
+
+    Patient-independent, so fixed lab panels can be built once and reused as
+    templates; callers add the per-request fields before POSTing.
+    """
+    # Compute interpretation
+    interpretation = "N"
+    if reference_low is not None and reference_high is not None:
+        if value > reference_high:
+            interpretation = "HH" if value > reference_high * 1.5 else "H"
+        elif value < reference_low:
+            interpretation = "LL" if value < reference_low * 0.5 else "L"
+
+    resource: dict = {
+        "resourceType": "Observation",
+        "status": status,
+        "category": [{
+            "coding": [{
+                "system": "http://terminology.hl7.org/CodeSystem/observation-category",
+                "code": "laboratory",
+                "display": "Laboratory",
+            }]
+        }],
+        "code": {
+            "coding": [{
+                "system": "http://loinc.org",
+                "code": loinc_code,
+                "display": loinc_display,
+            }],
+            "text": loinc_display,
+        },
+        "valueQuantity": {
+            "value": value,
+            "unit": unit,
+            "system": "http://unitsofmeasure.org",
+            "code": unit,
+        },
+        "interpretation": [{
+            "coding": [{
+                "system": "http://terminology.hl7.org/CodeSystem/v3-ObservationInterpretation",
+                "code": interpretation,
+                "display": _INTERP_DISPLAY[interpretation],
+            }]
+        }],
+    }
+
+    if reference_low is not None and reference_high is not None:
+        resource["referenceRange"] = [{
+            "low": {"value": reference_low, "unit": unit, "system": "http://unitsofmeasure.org"},
+            "high": {"value": reference_high, "unit": unit, "system": "http://unitsofmeasure.org"},
+        }]
+
+    return resource
+
 
 class FHIRClient:
     def __init__(self, base_url: str = FHIR_BASE):
         self.base_url = base_url.rstrip("/")
-        self.client = httpx.Client(base_url=self.base_url, headers=HEADERS, timeout=10)
+        self._client: httpx.Client | None = None
+        self._aclient: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.Client:
+        """Sync client (created on first use, and again after close())."""
+        if self._client is None:
+            # HTTP/2 is negotiated via ALPN, so it only kicks in for https:// FHIR servers
+            self._client = httpx.Client(
+                base_url=self.base_url, headers=HEADERS, timeout=10,
+                transport=httpx.HTTPTransport(http2=True, limits=POOL_LIMITS, retries=1),
+            )
+        return self._client
+
+    @property
+    def aclient(self) -> httpx.AsyncClient:
+        """Async client for fan-out from async endpoints (created on first use)."""
+        if self._aclient is None:
+            self._aclient = httpx.AsyncClient(
+                base_url=self.base_url, headers=HEADERS, timeout=10,
+                transport=httpx.AsyncHTTPTransport(http2=True, limits=POOL_LIMITS, retries=1),
+            )
+        return self._aclient
 
     def close(self):
-        self.client.close()
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self):
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
 
     # --- List / Search ---
 
     def list_patients(self) -> list[dict]:
         """List all patients. Returns [{id, name, gender, birthDate}]."""
-        resp = self.client.get("/Patient", params={"_count": "100"})
+        resp = self.client.get(
+            "/Patient",
+            params={"_count": "100", "_elements": "id,name,gender,birthDate"},
+        )
         resp.raise_for_status()
         patients = []
         for entry in resp.json().get("entry", []):
@@ -305,17 +426,7 @@ class FHIRClient:
         image_type: str = "chest_xray",
     ) -> dict:
         """Create a DiagnosticReport for medical image analysis (FHIR R4)."""
-        loinc_codes = {
-            "chest_xray": ("36643-5", "XR Chest 2 Views"),
-            "mri": ("24590-2", "MR Brain"),
-            "ct": ("24727-0", "CT study"),
-            "fundoscopy": ("32451-7", "Physical findings of Eye"),
-            "ecg": ("11524-6", "EKG study"),
-            "dermatology": ("72170-4", "Photographic image"),
-            "pathology": ("60567-5", "Pathology Diagnostic study note"),
-            "general": ("18748-4", "Diagnostic imaging study"),
-        }
-        code, display = loinc_codes.get(image_type, loinc_codes["general"])
+        code, display = LOINC_IMAGING_CODES.get(image_type, LOINC_IMAGING_CODES["general"])
 
         full_report = f"FINDINGS:\n{findings_text}\n\nIMPRESSION:\n{conclusion}"
         encoded_report = base64.b64encode(full_report.encode()).decode()
@@ -378,72 +489,27 @@ class FHIRClient:
         status: str = "final",
     ) -> dict:
         """Create an Observation for a lab result (FHIR R4, LOINC coded)."""
-        # Compute interpretation
-        interpretation = "N"
-        if reference_low is not None and reference_high is not None:
-            if value > reference_high:
-                interpretation = "HH" if value > reference_high * 1.5 else "H"
-            elif value < reference_low:
-                interpretation = "LL" if value < reference_low * 0.5 else "L"
-
-        interp_display = {
-            "N": "Normal", "H": "High", "L": "Low",
-            "HH": "Critically high", "LL": "Critically low",
-        }
-
-        resource: dict = {
-            "resourceType": "Observation",
-            "status": status,
-            "category": [{
-                "coding": [{
-                    "system": "http://terminology.hl7.org/CodeSystem/observation-category",
-                    "code": "laboratory",
-                    "display": "Laboratory",
-                }]
-            }],
-            "code": {
-                "coding": [{
-                    "system": "http://loinc.org",
-                    "code": loinc_code,
-                    "display": loinc_display,
-                }],
-                "text": loinc_display,
-            },
-            "subject": {"reference": f"Patient/{patient_id}"},
-            "effectiveDateTime": datetime.now(timezone.utc).isoformat(),
-            "valueQuantity": {
-                "value": value,
-                "unit": unit,
-                "system": "http://unitsofmeasure.org",
-                "code": unit,
-            },
-            "interpretation": [{
-                "coding": [{
-                    "system": "http://terminology.hl7.org/CodeSystem/v3-ObservationInterpretation",
-                    "code": interpretation,
-                    "display": interp_display[interpretation],
-                }]
-            }],
-        }
-
+        resource = build_observation_resource(
+            loinc_code, loinc_display, value, unit,
+            reference_low, reference_high, status,
+        )
+        resource["subject"] = {"reference": f"Patient/{patient_id}"}
+        resource["effectiveDateTime"] = datetime.now(timezone.utc).isoformat()
         if encounter_id:
             resource["encounter"] = {"reference": f"Encounter/{encounter_id}"}
+        return self.post_observation(resource)
 
-        if reference_low is not None and reference_high is not None:
-            resource["referenceRange"] = [{
-                "low": {"value": reference_low, "unit": unit, "system": "http://unitsofmeasure.org"},
-                "high": {"value": reference_high, "unit": unit, "system": "http://unitsofmeasure.org"},
-            }]
-
+    def post_observation(self, resource: dict) -> dict:
+        """POST a fully built Observation resource. Returns the same summary as create_observation."""
         resp = self.client.post("/Observation", json=resource)
         resp.raise_for_status()
         created = resp.json()
         return {
             "id": created["id"],
-            "loinc_code": loinc_code,
-            "value": value,
-            "unit": unit,
-            "interpretation": interpretation,
+            "loinc_code": resource["code"]["coding"][0]["code"],
+            "value": resource["valueQuantity"]["value"],
+            "unit": resource["valueQuantity"]["unit"],
+            "interpretation": resource["interpretation"][0]["coding"][0]["code"],
         }
 
     def search_observations(self, patient_id: str) -> list[dict]:
@@ -454,6 +520,9 @@ class FHIRClient:
                 "subject": f"Patient/{patient_id}",
                 "category": "laboratory",
                 "_count": "100",
+                # Only the fields parsed below — skips narrative/meta payload
+                "_elements": "id,code,status,valueQuantity,referenceRange,"
+                             "interpretation,effectiveDateTime",
             },
         )
         resp.raise_for_status()
@@ -491,3 +560,16 @@ class FHIRClient:
         doc = resp.json()
         encoded = doc["content"][0]["attachment"]["data"]
         return base64.b64decode(encoded).decode()
+
+
+# ─── Singleton instance ──────────────────────────────────
+
+_fhir_client: FHIRClient | None = None
+
+
+def get_fhir_client() -> FHIRClient:
+    """Get the process-wide FHIR client (one connection pool for all callers)."""
+    global _fhir_client
+    if _fhir_client is None:
+        _fhir_client = FHIRClient()
+    return _fhir_client
@@ -21,21 +21,17 @@ _project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if _project_root not in sys.path:
     sys.path.insert(0, _project_root)
 
-from backend.app.services.neo4j_service import get_neo4j_service
+from backend.app.services.neo4j_service import get_neo4j_service, is_high_risk_interaction
 from backend.app.services.terminology_service import (
-    get_rxnorm, get_snomed, suggest_icd10_from_soap,
+    crosswalk_icd10_cached, get_rxnorm, normalize_drug_cached,
+    suggest_icd10_from_soap,
 )
-from backend.fhir_resources import FHIRClient
+from backend.fhir_resources import get_fhir_client
 
 # ─── MCP Server ──────────────────────────────────────────
 
 mcp = FastMCP("medgemma-clinical-tools")
 
-_HIGH_RISK_KEYWORDS = [
-    "bleeding", "anticoagulant", "qtc", "serotonergic",
-    "cardiotoxic", "nephrotoxic", "hepatotoxic", "respiratory",
-]
-
 
 # ─── Tool 1: Drug-Drug Interactions ─────────────────────
 
@@ -58,9 +54,7 @@ def check_drug_interactions(medications: list[str]) -> str:
 
     interactions = []
     for i in result.interactions:
-        severity = "critical" if any(
-            kw in i.interaction_type.lower() for kw in _HIGH_RISK_KEYWORDS
-        ) else "moderate"
+        severity = "critical" if is_high_risk_interaction(i.interaction_type) else "moderate"
         interactions.append({
             "drug1": i.drug1,
             "drug2": i.drug2,
@@ -171,8 +165,7 @@ def normalize_medication(drug_name: str) -> str:
     Returns:
         JSON string with found (bool), rxcui, name, tty. If not found, includes suggestions.
     """
-    rxnorm = get_rxnorm()
-    result = rxnorm.normalize(drug_name)
+    result = normalize_drug_cached(drug_name)
     if result:
         return json.dumps({
             "found": True,
@@ -182,7 +175,7 @@ def normalize_medication(drug_name: str) -> str:
         })
 
     # Fuzzy fallback
-    approx = rxnorm.approximate_search(drug_name, max_entries=3)
+    approx = get_rxnorm().approximate_search(drug_name, max_entries=3)
     return json.dumps({
         "found": False,
         "suggestions": [
@@ -207,11 +200,7 @@ def lookup_patient_labs(patient_id: str) -> str:
     Returns:
         JSON string with labs list and abnormal_count.
     """
-    fhir = FHIRClient()
-    try:
-        observations = fhir.search_observations(patient_id)
-    finally:
-        fhir.close()
+    observations = get_fhir_client().search_observations(patient_id)
 
     abnormal = sum(1 for o in observations if o.get("interpretation", "N") != "N")
 
@@ -261,101 +250,93 @@ def export_clinical_encounter(
     Returns:
         JSON string with created resource IDs and summary count.
     """
-    fhir = FHIRClient()
-    rxnorm = get_rxnorm()
-    snomed = get_snomed()
+    fhir = get_fhir_client()
     medications = medications or []
     icd10_codes = icd10_codes or []
     ddi_alerts = ddi_alerts or []
 
-    try:
-        results = {
-            "encounter": None,
-            "document": None,
-            "medications": [],
-            "conditions": [],
-            "detected_issues": [],
-            "errors": [],
-        }
-
-        # 1. Create Encounter
-        enc = fhir.create_encounter(patient_id, reason)
-        results["encounter"] = enc
-        encounter_id = enc["id"]
-
-        # 2. Create DocumentReference (SOAP note)
-        doc = fhir.create_document_reference(patient_id, encounter_id, soap_text)
-        results["document"] = doc
-
-        # 3. MedicationRequests (RxNorm-coded)
-        med_id_map = {}
-        for drug_name in medications:
-            try:
-                rx = rxnorm.normalize(drug_name)
-                if rx:
-                    med = fhir.create_medication_request(
-                        patient_id, encounter_id, drug_name, rx.rxcui, rx.name
-                    )
-                else:
-                    med = fhir.create_medication_request(
-                        patient_id, encounter_id, drug_name
-                    )
-                results["medications"].append(med)
-                med_id_map[drug_name.lower()] = med["id"]
-            except Exception as e:
-                results["errors"].append(f"MedicationRequest({drug_name}): {e}")
-
-        # 4. Conditions (ICD-10 + SNOMED dual-coded)
-        for icd in icd10_codes:
-            try:
-                snomed_result = snomed.crosswalk_icd10(icd["code"])
-                cond = fhir.create_condition(
-                    patient_id, encounter_id,
-                    icd["code"], icd["description"],
-                    snomed_result.code if snomed_result else None,
-                    snomed_result.name if snomed_result else None,
+    results = {
+        "encounter": None,
+        "document": None,
+        "medications": [],
+        "conditions": [],
+        "detected_issues": [],
+        "errors": [],
+    }
+
+    # 1. Create Encounter
+    enc = fhir.create_encounter(patient_id, reason)
+    results["encounter"] = enc
+    encounter_id = enc["id"]
+
+    # 2. Create DocumentReference (SOAP note)
+    doc = fhir.create_document_reference(patient_id, encounter_id, soap_text)
+    results["document"] = doc
+
+    # 3. MedicationRequests (RxNorm-coded)
+    med_id_map = {}
+    for drug_name in medications:
+        try:
+            rx = normalize_drug_cached(drug_name)
+            if rx:
+                med = fhir.create_medication_request(
+                    patient_id, encounter_id, drug_name, rx.rxcui, rx.name
                 )
-                results["conditions"].append(cond)
-            except Exception as e:
-                results["errors"].append(f"Condition({icd['code']}): {e}")
-
-        # 5. DetectedIssues (DDI alerts)
-        for alert in ddi_alerts:
-            try:
-                implicated = []
-                d1_id = med_id_map.get(alert["drug1"].lower())
-                d2_id = med_id_map.get(alert["drug2"].lower())
-                if d1_id:
-                    implicated.append(d1_id)
-                if d2_id:
-                    implicated.append(d2_id)
-
-                severity = "high" if any(
-                    kw in alert["interaction_type"].lower() for kw in _HIGH_RISK_KEYWORDS
-                ) else "moderate"
-
-                di = fhir.create_detected_issue(
-                    patient_id,
-                    f"{alert['drug1']} + {alert['drug2']}: {alert['interaction_type']}",
-                    severity, implicated, alert.get("acknowledged", True),
+            else:
+                med = fhir.create_medication_request(
+                    patient_id, encounter_id, drug_name
                 )
-                results["detected_issues"].append(di)
-            except Exception as e:
-                results["errors"].append(f"DetectedIssue: {e}")
-
-        total = (
-            (1 if results["encounter"] else 0)
-            + (1 if results["document"] else 0)
-            + len(results["medications"])
-            + len(results["conditions"])
-            + len(results["detected_issues"])
-        )
-        results["summary"] = f"{total} FHIR resources created"
-
-        return json.dumps(results)
-
-    finally:
-        fhir.close()
+            results["medications"].append(med)
+            med_id_map[drug_name.lower()] = med["id"]
+        except Exception as e:
+            results["errors"].append(f"MedicationRequest({drug_name}): {e}")
+
+    # 4. Conditions (ICD-10 + SNOMED dual-coded)
+    for icd in icd10_codes:
+        try:
+            snomed_result = crosswalk_icd10_cached(icd["code"])
+            cond = fhir.create_condition(
+                patient_id, encounter_id,
+                icd["code"], icd["description"],
+                snomed_result.code if snomed_result else None,
+                snomed_result.name if snomed_result else None,
+            )
+            results["conditions"].append(cond)
+        except Exception as e:
+            results["errors"].append(f"Condition({icd['code']}): {e}")
+
+    # 5. DetectedIssues (DDI alerts)
+    for alert in ddi_alerts:
+        try:
+            implicated = []
+            d1_id = med_id_map.get(alert["drug1"].lower())
+            d2_id = med_id_map.get(alert["drug2"].lower())
+            if d1_id:
+                implicated.append(d1_id)
+            if d2_id:
+                implicated.append(d2_id)
+
+            severity = "high" if is_high_risk_interaction(alert["interaction_type"]) else "moderate"
+
+            di = fhir.create_detected_issue(
+                patient_id,
+                f"{alert['drug1']} + {alert['drug2']}: {alert['interaction_type']}",
+                severity, implicated, alert.get("acknowledged", True),
+            )
+            results["detected_issues"].append(di)
+        except Exception as e:
+            results["errors"].append(f"DetectedIssue: {e}")
+
+    total = (
+        (1 if results["encounter"] else 0)
+        + (1 if results["document"] else 0)
+        + len(results["medications"])
+        + len(results["conditions"])
+        + len(results["detected_issues"])
+    )
+    results["summary"] = f"{total} FHIR resources created"
+
+    return json.dumps(results)
 
 
 # ─── Standalone MCP Server ───────────────────────────────
@@ -20,6 +20,7 @@ Key endpoints:
   POST /tools/search_snomed                — SNOMED CT concept search (UMLS API)
   POST /tools/suggest_codes                — Extract diagnoses from SOAP → ICD-10 suggestions
   POST /tools/analyze_medical_image        — MedGemma vision (proxy to llama-server)
+  POST /tools/analyze_medical_image_stream — Same, streamed token-by-token (SSE)
   POST /tools/fhir_export_diagnostic_report — Export DiagnosticReport to FHIR
   GET  /tools/list_diagnostic_reports      — List existing DiagnosticReports
   POST /tools/fhir_create_observation      — Create lab result Observation
@@ -30,29 +31,70 @@ Key endpoints:
 
 Dashboard:
   GET /dashboard — EMR-style clinical resource browser
+  GET /dashboard/doc/{id} — Full SOAP text for an expanded dashboard row
 """
 
+import asyncio
 import base64
+import binascii
+import gzip
+import hashlib
+import logging
+import mmap
 import os
 import re
+import threading
+import time
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 
 import httpx as httpx_async
+import orjson
+from cachetools import TTLCache
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-from pydantic import BaseModel
+from fastapi.staticfiles import StaticFiles
+from fastapi.responses import (
+    HTMLResponse, ORJSONResponse, PlainTextResponse, Response, StreamingResponse,
+)
+from jinja2 import Environment, FileSystemLoader
+from markupsafe import Markup, escape
+from pydantic import BaseModel, ConfigDict
 
-from backend.fhir_resources import FHIRClient
-from backend.app.services.neo4j_service import get_neo4j_service
+from backend.fhir_resources import (
+    LOINC_IMAGING_CODES, build_observation_resource, get_fhir_client,
+)
+from backend.app.services.neo4j_service import get_neo4j_service, is_high_risk_interaction
 from backend.app.services.terminology_service import (
-    get_rxnorm, get_snomed, suggest_icd10_from_soap,
+    crosswalk_icd10_cached, get_rxnorm, get_snomed, normalize_drug_cached,
+    suggest_icd10_from_soap,
 )
 from backend.app.services.enhance_service import enhance_soap
 
-app = FastAPI(title="MedGemma MCP Server", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the pooled HTTP clients for this serving loop and close them all on shutdown."""
+    global _vision_client
+    _vision_client = httpx_async.AsyncClient(base_url=LLAMA_VISION_URL, timeout=120.0)
+    try:
+        yield
+    finally:
+        await _vision_client.aclose()
+        _vision_client = None
+        # The FHIR clients are created lazily, so the next startup reopens them
+        await fhir.aclose()
+        fhir.close()
+
+
+app = FastAPI(
+    title="MedGemma MCP Server", version="0.1.0",
+    default_response_class=ORJSONResponse, lifespan=lifespan,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -61,57 +103,122 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-fhir = FHIRClient()
+logger = logging.getLogger("mcp_server")
+
+fhir = get_fhir_client()
+
+
+@app.exception_handler(httpx_async.HTTPStatusError)
+async def upstream_status_error(request: Request, exc: httpx_async.HTTPStatusError):
+    """Pass FHIR / llama-server failures on as 404 or 502 rather than an opaque 500."""
+    status = exc.response.status_code
+    logger.warning("Upstream %s on %s %s: %s", status, request.method, request.url.path, exc.request.url)
+    return ORJSONResponse(
+        status_code=404 if status == 404 else 502,
+        content={"detail": f"Upstream server returned {status}"},
+    )
+
+
+@app.exception_handler(Exception)
+async def unhandled_exception(request: Request, exc: Exception):
+    """
+    Return a small 500 instead of str(exc).
+
+    Starlette re-raises after this handler, so the server logs the traceback.
+    """
+    return ORJSONResponse(status_code=500, content={"detail": "Internal server error"})
+
+
+# --- Short-lived cache for polled list endpoints ---
+# The phone re-requests the same patient's lists on every screen refresh.
+# Entries live a few seconds and are dropped whenever this server writes to
+# FHIR; each carries an ETag so unchanged lists revalidate as 304 with no body.
+
+_LIST_CACHE_TTL = 5.0
+_list_cache: TTLCache = TTLCache(maxsize=1024, ttl=_LIST_CACHE_TTL)
+_list_cache_lock = threading.Lock()  # sync endpoints run in the threadpool
+
+
+def _invalidate_response_caches():
+    with _list_cache_lock:
+        _list_cache.clear()
+    _dashboard_cache["expires"] = 0.0
+
+
+def _cached_list_response(request: Request, key: tuple, fetch) -> Response:
+    """Serve {"status": "ok", "data": fetch()} from cache, honoring If-None-Match."""
+    with _list_cache_lock:
+        hit = _list_cache.get(key)
+    if hit is None:
+        data = fetch()
+        digest = hashlib.blake2b(
+            orjson.dumps(data, option=orjson.OPT_SORT_KEYS, default=str), digest_size=16,
+        ).hexdigest()
+        hit = (data, f'"{digest}"')
+        with _list_cache_lock:
+            _list_cache[key] = hit
+
+    data, etag = hit
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return ORJSONResponse({"status": "ok", "data": data}, headers=headers)
 
 
 # --- Request schemas ---
 
-class CreateEncounterRequest(BaseModel):
+class _RequestModel(BaseModel):
+    """Base for request bodies: immutable, reject unknown keys, leave large strings untouched."""
+
+    model_config = ConfigDict(frozen=True, extra="forbid", str_strip_whitespace=False)
+
+
+class CreateEncounterRequest(_RequestModel):
     patient_id: str
     reason: str
 
 
-class ExportSOAPRequest(BaseModel):
+class ExportSOAPRequest(_RequestModel):
     patient_id: str
     encounter_id: str
     soap_text: str
 
 
-class CheckDDIRequest(BaseModel):
+class CheckDDIRequest(_RequestModel):
     medications: list[str]
 
 
-class SearchICD10Request(BaseModel):
+class SearchICD10Request(_RequestModel):
     query: str
     limit: int = 5
 
 
-class SearchDrugRequest(BaseModel):
+class SearchDrugRequest(_RequestModel):
     query: str
     limit: int = 5
 
 
-class NormalizeDrugRequest(BaseModel):
+class NormalizeDrugRequest(_RequestModel):
     drug_name: str
 
 
-class SearchSNOMEDRequest(BaseModel):
+class SearchSNOMEDRequest(_RequestModel):
     term: str
     limit: int = 5
 
 
-class SuggestCodesRequest(BaseModel):
+class SuggestCodesRequest(_RequestModel):
     soap_text: str
 
 
-class AnalyzeImageRequest(BaseModel):
+class AnalyzeImageRequest(_RequestModel):
     image_base64: str
     image_type: str = "chest_xray"
     clinical_context: str = ""
     patient_id: str = ""
 
 
-class ExportDiagnosticReportRequest(BaseModel):
+class ExportDiagnosticReportRequest(_RequestModel):
     patient_id: str
     encounter_id: str | None = None
     conclusion: str
@@ -119,19 +226,19 @@ class ExportDiagnosticReportRequest(BaseModel):
     image_type: str = "chest_xray"
 
 
-class ICD10CodeData(BaseModel):
+class ICD10CodeData(_RequestModel):
     code: str
     description: str
 
 
-class DDIAlertData(BaseModel):
+class DDIAlertData(_RequestModel):
     drug1: str
     drug2: str
     interaction_type: str
     acknowledged: bool = True
 
 
-class CreateObservationRequest(BaseModel):
+class CreateObservationRequest(_RequestModel):
     patient_id: str
     encounter_id: str | None = None
     loinc_code: str
@@ -142,11 +249,11 @@ class CreateObservationRequest(BaseModel):
     reference_high: float | None = None
 
 
-class SeedDemoLabsRequest(BaseModel):
+class SeedDemoLabsRequest(_RequestModel):
     patient_id: str = "1000"
 
 
-class FullExportRequest(BaseModel):
+class FullExportRequest(_RequestModel):
     patient_id: str
     reason: str
     soap_text: str
@@ -159,28 +266,16 @@ class FullExportRequest(BaseModel):
 
 @app.post("/tools/fhir_create_encounter")
 def create_encounter(req: CreateEncounterRequest):
-    try:
-        result = fhir.create_encounter(req.patient_id, req.reason)
-        return {"status": "ok", "data": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    result = fhir.create_encounter(req.patient_id, req.reason)
+    return {"status": "ok", "data": result}
 
 
 @app.post("/tools/fhir_export_soap")
 def export_soap(req: ExportSOAPRequest):
-    try:
-        result = fhir.create_document_reference(
-            req.patient_id, req.encounter_id, req.soap_text
-        )
-        return {"status": "ok", "data": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-_HIGH_RISK_KEYWORDS = [
-    "bleeding", "anticoagulant", "qtc", "serotonergic",
-    "cardiotoxic", "nephrotoxic", "hepatotoxic", "respiratory",
-]
+    result = fhir.create_document_reference(
+        req.patient_id, req.encounter_id, req.soap_text
+    )
+    return {"status": "ok", "data": result}
 
 
 @app.post("/tools/fhir_export_full")
@@ -191,239 +286,216 @@ def export_full(req: FullExportRequest):
     Creates: Encounter → DocumentReference → MedicationRequests (RxNorm) →
              Conditions (ICD-10 + SNOMED) → DetectedIssues (DDI).
     """
-    try:
-        results = {
-            "encounter": None,
-            "document": None,
-            "medications": [],
-            "conditions": [],
-            "detected_issues": [],
-            "errors": [],
-        }
-
-        # 0. Auto-create patient if none selected (new walk-in patient)
-        patient_id = req.patient_id
-        if not patient_id:
-            anon = fhir.create_anonymous_patient()
-            patient_id = anon["id"]
-            results["new_patient"] = anon
-
-        # 1. Create Encounter
-        enc = fhir.create_encounter(patient_id, req.reason)
-        results["encounter"] = enc
-        encounter_id = enc["id"]
-
-        # 2. Create DocumentReference (SOAP note)
-        doc = fhir.create_document_reference(
-            patient_id, encounter_id, req.soap_text
-        )
-        results["document"] = doc
+    results = {
+        "encounter": None,
+        "document": None,
+        "medications": [],
+        "conditions": [],
+        "detected_issues": [],
+        "errors": [],
+    }
+
+    # 0. Auto-create patient if none selected (new walk-in patient)
+    patient_id = req.patient_id
+    if not patient_id:
+        anon = fhir.create_anonymous_patient()
+        patient_id = anon["id"]
+        results["new_patient"] = anon
+
+    # 1. Create Encounter
+    enc = fhir.create_encounter(patient_id, req.reason)
+    results["encounter"] = enc
+    encounter_id = enc["id"]
+
+    # 2. Create DocumentReference (SOAP note)
+    doc = fhir.create_document_reference(
+        patient_id, encounter_id, req.soap_text
+    )
+    results["document"] = doc
 
-        # 3. Create MedicationRequests (with RxNorm normalization)
-        rxnorm = get_rxnorm()
-        med_id_map: dict[str, str] = {}  # drug_name_lower -> fhir_id
+    # 3. Create MedicationRequests (with RxNorm normalization)
+    med_id_map: dict[str, str] = {}  # drug_name_lower -> fhir_id
 
-        for drug_name in req.medications:
-            try:
-                rx_result = rxnorm.normalize(drug_name)
-                if rx_result:
-                    med = fhir.create_medication_request(
-                        patient_id, encounter_id,
-                        drug_name, rx_result.rxcui, rx_result.name,
-                    )
-                else:
-                    med = fhir.create_medication_request(
-                        patient_id, encounter_id, drug_name,
-                    )
-                results["medications"].append(med)
-                med_id_map[drug_name.lower()] = med["id"]
-            except Exception as e:
-                results["errors"].append(f"MedicationRequest({drug_name}): {e}")
-
-        # 4. Create Conditions (with SNOMED crosswalk)
-        snomed = get_snomed()
-        for icd in req.icd10_codes:
-            try:
-                snomed_result = snomed.crosswalk_icd10(icd.code)
-                cond = fhir.create_condition(
+    for drug_name in req.medications:
+        try:
+            rx_result = normalize_drug_cached(drug_name)
+            if rx_result:
+                med = fhir.create_medication_request(
                     patient_id, encounter_id,
-                    icd.code, icd.description,
-                    snomed_result.code if snomed_result else None,
-                    snomed_result.name if snomed_result else None,
+                    drug_name, rx_result.rxcui, rx_result.name,
                 )
-                results["conditions"].append(cond)
-            except Exception as e:
-                results["errors"].append(f"Condition({icd.code}): {e}")
-
-        # 5. Create DetectedIssues (DDI alerts doctor acknowledged)
-        for alert in req.ddi_alerts:
-            try:
-                implicated = []
-                d1_id = med_id_map.get(alert.drug1.lower())
-                d2_id = med_id_map.get(alert.drug2.lower())
-                if d1_id:
-                    implicated.append(d1_id)
-                if d2_id:
-                    implicated.append(d2_id)
-
-                severity = "high" if any(
-                    kw in alert.interaction_type.lower()
-                    for kw in _HIGH_RISK_KEYWORDS
-                ) else "moderate"
-
-                di = fhir.create_detected_issue(
-                    patient_id,
-                    f"{alert.drug1} + {alert.drug2}: {alert.interaction_type}",
-                    severity,
-                    implicated,
-                    alert.acknowledged,
-                )
-                results["detected_issues"].append(di)
-            except Exception as e:
-                results["errors"].append(
-                    f"DetectedIssue({alert.drug1}+{alert.drug2}): {e}"
+            else:
+                med = fhir.create_medication_request(
+                    patient_id, encounter_id, drug_name,
                 )
+            results["medications"].append(med)
+            med_id_map[drug_name.lower()] = med["id"]
+        except Exception as e:
+            results["errors"].append(f"MedicationRequest({drug_name}): {e}")
 
-        # Summary
-        total = (
-            (1 if results["encounter"] else 0)
-            + (1 if results["document"] else 0)
-            + len(results["medications"])
-            + len(results["conditions"])
-            + len(results["detected_issues"])
-        )
-        results["summary"] = f"{total} FHIR resources created"
-        if results["errors"]:
-            results["summary"] += f" ({len(results['errors'])} warnings)"
+    # 4. Create Conditions (with SNOMED crosswalk)
+    for icd in req.icd10_codes:
+        try:
+            snomed_result = crosswalk_icd10_cached(icd.code)
+            cond = fhir.create_condition(
+                patient_id, encounter_id,
+                icd.code, icd.description,
+                snomed_result.code if snomed_result else None,
+                snomed_result.name if snomed_result else None,
+            )
+            results["conditions"].append(cond)
+        except Exception as e:
+            results["errors"].append(f"Condition({icd.code}): {e}")
+
+    # 5. Create DetectedIssues (DDI alerts doctor acknowledged)
+    for alert in req.ddi_alerts:
+        try:
+            implicated = []
+            d1_id = med_id_map.get(alert.drug1.lower())
+            d2_id = med_id_map.get(alert.drug2.lower())
+            if d1_id:
+                implicated.append(d1_id)
+            if d2_id:
+                implicated.append(d2_id)
+
+            severity = (
+                "high" if is_high_risk_interaction(alert.interaction_type)
+                else "moderate"
+            )
 
-        return {"status": "ok", "data": results}
+            di = fhir.create_detected_issue(
+                patient_id,
+                f"{alert.drug1} + {alert.drug2}: {alert.interaction_type}",
+                severity,
+                implicated,
+                alert.acknowledged,
+            )
+            results["detected_issues"].append(di)
+        except Exception as e:
+            results["errors"].append(
+                f"DetectedIssue({alert.drug1}+{alert.drug2}): {e}"
+            )
+
+    # Summary
+    total = (
+        (1 if results["encounter"] else 0)
+        + (1 if results["document"] else 0)
+        + len(results["medications"])
+        + len(results["conditions"])
+        + len(results["detected_issues"])
+    )
+    results["summary"] = f"{total} FHIR resources created"
+    if results["errors"]:
+        results["summary"] += f" ({len(results['errors'])} warnings)"
+
+    _invalidate_response_caches()
+    return {"status": "ok", "data": results}
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/tools/check_drug_interactions")
 def check_drug_interactions(req: CheckDDIRequest):
-    try:
-        neo4j = get_neo4j_service()
-        result = neo4j.check_interactions(req.medications)
-        return {
-            "status": "ok",
-            "data": {
-                "found": result.found,
-                "summary": result.summary,
-                "interactions": [
-                    {
-                        "drug1": i.drug1,
-                        "drug2": i.drug2,
-                        "interaction_type": i.interaction_type,
-                    }
-                    for i in result.interactions
-                ],
-            },
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    neo4j = get_neo4j_service()
+    result = neo4j.check_interactions(req.medications)
+    return {
+        "status": "ok",
+        "data": {
+            "found": result.found,
+            "summary": result.summary,
+            "interactions": [
+                {
+                    "drug1": i.drug1,
+                    "drug2": i.drug2,
+                    "interaction_type": i.interaction_type,
+                }
+                for i in result.interactions
+            ],
+        },
+    }
 
 
 @app.post("/tools/search_icd10")
 def search_icd10(req: SearchICD10Request):
-    try:
-        neo4j = get_neo4j_service()
-        results = neo4j.search_icd10(req.query, req.limit)
-        return {"status": "ok", "data": {"results": results}}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    neo4j = get_neo4j_service()
+    results = neo4j.search_icd10(req.query, req.limit)
+    return {"status": "ok", "data": {"results": results}}
 
 
 @app.post("/tools/search_drug")
 def search_drug(req: SearchDrugRequest):
     """Search drugs via Neo4j fulltext (DrugBank names)."""
-    try:
-        neo4j = get_neo4j_service()
-        results = neo4j.search_drug(req.query, req.limit)
-        return {"status": "ok", "data": {"results": results}}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    neo4j = get_neo4j_service()
+    results = neo4j.search_drug(req.query, req.limit)
+    return {"status": "ok", "data": {"results": results}}
 
 
 @app.post("/tools/normalize_drug")
 def normalize_drug(req: NormalizeDrugRequest):
     """Normalize a drug name to RxCUI via NLM RxNorm API."""
-    try:
-        rxnorm = get_rxnorm()
-        result = rxnorm.normalize(req.drug_name)
-        if result:
-            return {
-                "status": "ok",
-                "data": {
-                    "found": True,
-                    "rxcui": result.rxcui,
-                    "name": result.name,
-                    "tty": result.tty,
-                },
-            }
-        # Try fuzzy search as fallback
-        approx = rxnorm.approximate_search(req.drug_name, max_entries=3)
+    result = normalize_drug_cached(req.drug_name)
+    if result:
         return {
             "status": "ok",
             "data": {
-                "found": False,
-                "suggestions": [
-                    {"rxcui": d.rxcui, "name": d.name, "tty": d.tty}
-                    for d in approx
-                ],
+                "found": True,
+                "rxcui": result.rxcui,
+                "name": result.name,
+                "tty": result.tty,
             },
         }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Try fuzzy search as fallback
+    approx = get_rxnorm().approximate_search(req.drug_name, max_entries=3)
+    return {
+        "status": "ok",
+        "data": {
+            "found": False,
+            "suggestions": [
+                {"rxcui": d.rxcui, "name": d.name, "tty": d.tty}
+                for d in approx
+            ],
+        },
+    }
 
 
 @app.post("/tools/search_snomed")
 def search_snomed(req: SearchSNOMEDRequest):
     """Search SNOMED CT concepts via UMLS API."""
-    try:
-        snomed = get_snomed()
-        results = snomed.search(req.term, req.limit)
-        return {
-            "status": "ok",
-            "data": {
-                "results": [
-                    {
-                        "cui": r.cui,
-                        "code": r.code,
-                        "name": r.name,
-                        "semantic_type": r.semantic_type,
-                    }
-                    for r in results
-                ],
-            },
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    snomed = get_snomed()
+    results = snomed.search(req.term, req.limit)
+    return {
+        "status": "ok",
+        "data": {
+            "results": [
+                {
+                    "cui": r.cui,
+                    "code": r.code,
+                    "name": r.name,
+                    "semantic_type": r.semantic_type,
+                }
+                for r in results
+            ],
+        },
+    }
 
 
 @app.post("/tools/suggest_codes")
 def suggest_codes(req: SuggestCodesRequest):
     """Extract diagnoses from SOAP text and suggest ICD-10 codes via Neo4j."""
-    try:
-        result = suggest_icd10_from_soap(req.soap_text)
-        return {
-            "status": "ok",
-            "data": {
-                "suggestions": [
-                    {
-                        "code": s.code,
-                        "description": s.description,
-                        "matched_term": s.matched_term,
-                    }
-                    for s in result.icd10
-                ],
-                "terms_searched": result.terms_searched,
-            },
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    result = suggest_icd10_from_soap(req.soap_text)
+    return {
+        "status": "ok",
+        "data": {
+            "suggestions": [
+                {
+                    "code": s.code,
+                    "description": s.description,
+                    "matched_term": s.matched_term,
+                }
+                for s in result.icd10
+            ],
+            "terms_searched": result.terms_searched,
+        },
+    }
 
 
 # --- Iteration 8: Vision + DiagnosticReport ---
@@ -563,37 +635,71 @@ _VISION_PROMPTS = {
 }
 
 
+_THINK_RE = re.compile(r"<think>[\s\S]*?</think>")
+_FINDINGS_RE = re.compile(r"FINDINGS:\s*\n(.*?)(?=IMPRESSION:|$)", re.DOTALL)
+_IMPRESSION_RE = re.compile(r"IMPRESSION:\s*\n(.*?)$", re.DOTALL)
+
+# Shared across requests so llama-server connections are kept alive; opened by lifespan
+_vision_client: httpx_async.AsyncClient | None = None
+
+
+def _build_vision_payload(req: AnalyzeImageRequest, stream: bool = False) -> dict:
+    system_prompt = _VISION_PROMPTS.get(req.image_type, _VISION_PROMPTS["general"])
+
+    text_prompt = "Analyze this medical image."
+    if req.clinical_context:
+        text_prompt += f"\n\nClinical context: {req.clinical_context}"
+
+    return {
+        "model": "medgemma",
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": [
+                {"type": "image_url", "image_url": {
+                    "url": f"data:image/jpeg;base64,{req.image_base64}",
+                }},
+                {"type": "text", "text": text_prompt},
+            ]},
+        ],
+        "temperature": 0.4,
+        "max_tokens": 4096,
+        "stop": ["<end_of_turn>", "<eos>"],
+        "stream": stream,
+    }
+
+
+def _parse_vision_report(raw_report: str, image_type: str) -> dict:
+    """Split a raw MedGemma report into FINDINGS / IMPRESSION sections."""
+    # Strip thinking traces
+    raw_report = _THINK_RE.sub("", raw_report).strip()
+
+    findings = ""
+    impression = ""
+    findings_match = _FINDINGS_RE.search(raw_report)
+    impression_match = _IMPRESSION_RE.search(raw_report)
+    if findings_match:
+        findings = findings_match.group(1).strip()
+    if impression_match:
+        impression = impression_match.group(1).strip()
+    if not findings and not impression:
+        findings = raw_report
+
+    return {
+        "findings": findings,
+        "impression": impression,
+        "raw_report": raw_report,
+        "image_type": image_type,
+        "model": "medgemma-1.5-4b-it",
+    }
+
+
 @app.post("/tools/analyze_medical_image")
 async def analyze_medical_image(req: AnalyzeImageRequest):
     """Analyze a medical image using MedGemma vision on workstation llama-server."""
     try:
-        system_prompt = _VISION_PROMPTS.get(req.image_type, _VISION_PROMPTS["general"])
-
-        text_prompt = "Analyze this medical image."
-        if req.clinical_context:
-            text_prompt += f"\n\nClinical context: {req.clinical_context}"
-
-        payload = {
-            "model": "medgemma",
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": [
-                    {"type": "image_url", "image_url": {
-                        "url": f"data:image/jpeg;base64,{req.image_base64}",
-                    }},
-                    {"type": "text", "text": text_prompt},
-                ]},
-            ],
-            "temperature": 0.4,
-            "max_tokens": 4096,
-            "stop": ["<end_of_turn>", "<eos>"],
-        }
-
-        async with httpx_async.AsyncClient(timeout=120.0) as client:
-            resp = await client.post(
-                f"{LLAMA_VISION_URL}/v1/chat/completions",
-                json=payload,
-            )
+        resp = await _vision_client.post(
+            "/v1/chat/completions", json=_build_vision_payload(req),
+        )
 
         if resp.status_code != 200:
             raise HTTPException(
@@ -604,35 +710,7 @@ async def analyze_medical_image(req: AnalyzeImageRequest):
         result = resp.json()
         raw_report = result["choices"][0]["message"]["content"]
 
-        # Strip thinking traces
-        raw_report = re.sub(r"<think>[\s\S]*?</think>", "", raw_report).strip()
-
-        # Parse FINDINGS and IMPRESSION sections
-        findings = ""
-        impression = ""
-        findings_match = re.search(
-            r"FINDINGS:\s*\n(.*?)(?=IMPRESSION:|$)", raw_report, re.DOTALL,
-        )
-        impression_match = re.search(
-            r"IMPRESSION:\s*\n(.*?)$", raw_report, re.DOTALL,
-        )
-        if findings_match:
-            findings = findings_match.group(1).strip()
-        if impression_match:
-            impression = impression_match.group(1).strip()
-        if not findings and not impression:
-            findings = raw_report
-
-        return {
-            "status": "ok",
-            "data": {
-                "findings": findings,
-                "impression": impression,
-                "raw_report": raw_report,
-                "image_type": req.image_type,
-                "model": "medgemma-1.5-4b-it",
-            },
-        }
+        return {"status": "ok", "data": _parse_vision_report(raw_report, req.image_type)}
 
     except httpx_async.ConnectError:
         raise HTTPException(
@@ -644,88 +722,222 @@ async def analyze_medical_image(req: AnalyzeImageRequest):
             status_code=504,
             detail="Image analysis timed out (>120s). The image may be too large.",
         )
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+
+# SSE write coalescing: flush once this many bytes are buffered, or this long
+# after the first buffered line, whichever comes first
+_SSE_FLUSH_BYTES = 4096
+_SSE_FLUSH_DELAY = 0.010
+
+
+async def _coalesce_stream(source, max_bytes: int = _SSE_FLUSH_BYTES,
+                           max_delay: float = _SSE_FLUSH_DELAY):
+    """Merge small bytes lines from `source` into fewer, larger response writes.
+
+    Lines are never split, so JSON-lines framing is preserved; a line waits at
+    most `max_delay` seconds before it is sent.
+    """
+    loop = asyncio.get_running_loop()
+    it = source.__aiter__()
+    buf = bytearray()
+    deadline = 0.0
+    pending = None
+    try:
+        while True:
+            if pending is not None:
+                # Pull still in flight from before the last timed flush
+                nxt, pending = pending, None
+            elif not buf:
+                # Nothing buffered means no deadline: await the source directly
+                nxt = it.__anext__()
+            else:
+                # Only a buffered line needs a timer; a timeout flushes it but
+                # leaves the pull running, so the source is never interrupted
+                nxt = asyncio.ensure_future(it.__anext__())
+                done, _ = await asyncio.wait((nxt,), timeout=max(0.0, deadline - loop.time()))
+                if not done:
+                    pending = nxt
+                    yield bytes(buf)
+                    buf.clear()
+                    continue
+            try:
+                line = await nxt
+            except StopAsyncIteration:
+                break
+            if not buf:
+                deadline = loop.time() + max_delay
+            buf += line
+            if len(buf) >= max_bytes:
+                yield bytes(buf)
+                buf.clear()
+        if buf:
+            yield bytes(buf)
+    finally:
+        # Client went away mid-stream: stop the in-flight pull, then close the
+        # source so its upstream HTTP stream is released now rather than at GC
+        if pending is not None:
+            pending.cancel()
+            with suppress(asyncio.CancelledError, StopAsyncIteration):
+                await pending
+        await source.aclose()
+
+
+async def _stream_vision_report(req: AnalyzeImageRequest):
+    """
+    Relay llama-server tokens as they are generated.
+    Yields JSON lines: {"step": "token", "text": str}
+    Final yield: {"step": "done", "data": {findings, impression, ...}}
+    """
+    parts: list[str] = []
+    try:
+        async with _vision_client.stream(
+            "POST", "/v1/chat/completions", json=_build_vision_payload(req, stream=True),
+        ) as resp:
+            if resp.status_code != 200:
+                body = (await resp.aread()).decode(errors="replace")
+                yield orjson.dumps({
+                    "step": "error",
+                    "detail": f"llama-server returned {resp.status_code}: {body}",
+                }) + b"\n"
+                return
+
+            async for line in resp.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                chunk = line[6:]
+                if chunk == "[DONE]":
+                    break
+                choices = orjson.loads(chunk).get("choices")
+                if not choices:
+                    # Keep-alive / usage chunks carry no token
+                    continue
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    parts.append(delta)
+                    yield orjson.dumps({"step": "token", "text": delta}) + b"\n"
+
+    except httpx_async.ConnectError:
+        yield orjson.dumps({
+            "step": "error",
+            "detail": "Cannot connect to llama-server (vision). Run: ./workstation/start_vision.sh",
+        }) + b"\n"
+        return
+    except httpx_async.ReadTimeout:
+        yield orjson.dumps({
+            "step": "error",
+            "detail": "Image analysis timed out (>120s). The image may be too large.",
+        }) + b"\n"
+        return
+    except httpx_async.HTTPError as e:
+        yield orjson.dumps({
+            "step": "error",
+            "detail": f"llama-server stream failed: {type(e).__name__}",
+        }) + b"\n"
+        return
+    except orjson.JSONDecodeError:
+        yield orjson.dumps({
+            "step": "error",
+            "detail": "llama-server sent a malformed stream chunk",
+        }) + b"\n"
+        return
+
+    # Section parsing only needs the complete text, so it runs once at the end
+    yield orjson.dumps({
+        "step": "done",
+        "data": _parse_vision_report("".join(parts), req.image_type),
+    }) + b"\n"
+
+
+@app.post("/tools/analyze_medical_image_stream")
+async def analyze_medical_image_stream(req: AnalyzeImageRequest):
+    """
+    Streaming image analysis — returns Server-Sent Events (SSE) with tokens as
+    llama-server generates them, so the phone can render the report immediately.
+    """
+    return StreamingResponse(
+        _coalesce_stream(_stream_vision_report(req)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.post("/tools/fhir_export_diagnostic_report")
 def export_diagnostic_report(req: ExportDiagnosticReportRequest):
     """Export a radiology report as a FHIR DiagnosticReport."""
-    try:
-        result = fhir.create_diagnostic_report(
-            req.patient_id, req.encounter_id,
-            req.conclusion, req.findings_text, req.image_type,
-        )
-        return {"status": "ok", "data": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    result = fhir.create_diagnostic_report(
+        req.patient_id, req.encounter_id,
+        req.conclusion, req.findings_text, req.image_type,
+    )
+    _invalidate_response_caches()
+    return {"status": "ok", "data": result}
+
+
+# Map LOINC back to image_type
+_LOINC_TO_IMAGE_TYPE = {code: image_type for image_type, (code, _) in LOINC_IMAGING_CODES.items()}
+
+
+def _fetch_diagnostic_reports(patient_id: str) -> list[dict]:
+    resp = fhir.client.get(
+        "/DiagnosticReport",
+        params={
+            "subject": f"Patient/{patient_id}",
+            "_count": "50",
+            "_sort": "-_lastUpdated",
+            # Skip presentedForm — embedded base64 images can be MBs per report
+            "_elements": "id,status,conclusion,issued,code",
+        },
+        headers={"Accept": "application/fhir+json"},
+    )
+    resp.raise_for_status()
+    reports = []
+    for e in orjson.loads(resp.content).get("entry", []):
+        r = e["resource"]
+        loinc_code = ""
+        for c in r.get("code", {}).get("coding", []):
+            if "loinc" in c.get("system", ""):
+                loinc_code = c.get("code", "")
+        reports.append({
+            "id": r["id"],
+            "status": r.get("status", ""),
+            "conclusion": r.get("conclusion", ""),
+            "date": r.get("issued", "")[:19],
+            "image_type": _LOINC_TO_IMAGE_TYPE.get(loinc_code, "general"),
+        })
+    return reports
 
 
 @app.get("/tools/list_diagnostic_reports")
-def list_diagnostic_reports(patient_id: str):
+def list_diagnostic_reports(patient_id: str, request: Request):
     """List existing DiagnosticReports for a patient."""
-    try:
-        resp = fhir.client.get(
-            "/DiagnosticReport",
-            params={"subject": f"Patient/{patient_id}", "_count": "50", "_sort": "-_lastUpdated"},
-            headers={"Accept": "application/fhir+json"},
-        )
-        resp.raise_for_status()
-        reports = []
-        for e in resp.json().get("entry", []):
-            r = e["resource"]
-            loinc_code = ""
-            for c in r.get("code", {}).get("coding", []):
-                if "loinc" in c.get("system", ""):
-                    loinc_code = c.get("code", "")
-            # Map LOINC back to image_type
-            loinc_to_type = {
-                "36643-5": "chest_xray", "24590-2": "mri", "24727-0": "ct",
-                "32451-7": "fundoscopy", "11524-6": "ecg",
-                "72170-4": "dermatology", "60567-5": "pathology", "18748-4": "general",
-            }
-            reports.append({
-                "id": r["id"],
-                "status": r.get("status", ""),
-                "conclusion": r.get("conclusion", ""),
-                "date": r.get("issued", "")[:19],
-                "image_type": loinc_to_type.get(loinc_code, "general"),
-            })
-        return {"status": "ok", "data": reports}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return _cached_list_response(
+        request, ("diagnostic_reports", patient_id),
+        lambda: _fetch_diagnostic_reports(patient_id),
+    )
 
 
 @app.get("/tools/get_diagnostic_report_image")
 def get_diagnostic_report_image(report_id: str):
     """Fetch a DiagnosticReport's embedded image (base64) from FHIR."""
-    try:
-        resp = fhir.client.get(
-            f"/DiagnosticReport/{report_id}",
-            headers={"Accept": "application/fhir+json"},
-        )
-        resp.raise_for_status()
-        r = resp.json()
-        # Find image in presentedForm (first non-text entry)
-        for form in r.get("presentedForm", []):
-            ct = form.get("contentType", "")
-            if ct.startswith("image/"):
-                return {
-                    "status": "ok",
-                    "data": {
-                        "image_base64": form["data"],
-                        "content_type": ct,
-                        "title": form.get("title", ""),
-                        "conclusion": r.get("conclusion", ""),
-                    },
-                }
-        raise HTTPException(status_code=404, detail="No image found in DiagnosticReport")
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    resp = fhir.client.get(
+        f"/DiagnosticReport/{report_id}",
+        headers={"Accept": "application/fhir+json"},
+    )
+    resp.raise_for_status()
+    r = resp.json()
+    # Find image in presentedForm (first non-text entry)
+    for form in r.get("presentedForm", []):
+        ct = form.get("contentType", "")
+        if ct.startswith("image/"):
+            return {
+                "status": "ok",
+                "data": {
+                    "image_base64": form["data"],
+                    "content_type": ct,
+                    "title": form.get("title", ""),
+                    "conclusion": r.get("conclusion", ""),
+                },
+            }
+    raise HTTPException(status_code=404, detail="No image found in DiagnosticReport")
 
 
 # --- Iteration 9: Lab Results (Observations) ---
@@ -756,68 +968,58 @@ DEMO_LABS = [
     ("10839-9", "Troponin I", 0.08, "ng/mL", 0.0, 0.04),
 ]
 
+# Patient-independent Observation bodies, built once at import
+_DEMO_LAB_RESOURCES: list[dict] = [
+    build_observation_resource(loinc, display, val, unit, ref_lo, ref_hi)
+    for loinc, display, val, unit, ref_lo, ref_hi in DEMO_LABS
+]
+
 
 @app.post("/tools/fhir_create_observation")
 def create_observation(req: CreateObservationRequest):
     """Create a single lab result Observation in FHIR."""
-    try:
-        result = fhir.create_observation(
-            patient_id=req.patient_id,
-            encounter_id=req.encounter_id,
-            loinc_code=req.loinc_code,
-            loinc_display=req.loinc_display,
-            value=req.value,
-            unit=req.unit,
-            reference_low=req.reference_low,
-            reference_high=req.reference_high,
-        )
-        return {"status": "ok", "data": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    result = fhir.create_observation(
+        patient_id=req.patient_id,
+        encounter_id=req.encounter_id,
+        loinc_code=req.loinc_code,
+        loinc_display=req.loinc_display,
+        value=req.value,
+        unit=req.unit,
+        reference_low=req.reference_low,
+        reference_high=req.reference_high,
+    )
+    _invalidate_response_caches()
+    return {"status": "ok", "data": result}
 
 
 @app.get("/tools/list_observations")
-def list_observations(patient_id: str):
+def list_observations(patient_id: str, request: Request):
     """List lab result Observations for a patient."""
-    try:
-        results = fhir.search_observations(patient_id)
-        return {"status": "ok", "data": results}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return _cached_list_response(
+        request, ("observations", patient_id),
+        lambda: fhir.search_observations(patient_id),
+    )
 
 
 @app.post("/tools/seed_demo_labs")
 def seed_demo_labs(req: SeedDemoLabsRequest):
     """Seed demo patient with realistic lab values (CBC, BMP, Lipid, HbA1c, Troponin)."""
-    try:
-        created = []
-        for loinc, display, val, unit, ref_lo, ref_hi in DEMO_LABS:
-            result = fhir.create_observation(
-                patient_id=req.patient_id,
-                encounter_id=None,
-                loinc_code=loinc,
-                loinc_display=display,
-                value=val,
-                unit=unit,
-                reference_low=ref_lo,
-                reference_high=ref_hi,
-            )
-            created.append(result)
-        return {"status": "ok", "data": {"created": len(created), "observations": created}}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    subject = {"reference": f"Patient/{req.patient_id}"}
+    now = datetime.now(timezone.utc).isoformat()
+    created = [
+        fhir.post_observation({**tpl, "subject": subject, "effectiveDateTime": now})
+        for tpl in _DEMO_LAB_RESOURCES
+    ]
+    _invalidate_response_caches()
+    return {"status": "ok", "data": {"created": len(created), "observations": created}}
 
 
 # --- Iteration 11: Patient List + Seed Demo Patients ---
 
 @app.get("/tools/list_patients")
-def list_patients():
+def list_patients(request: Request):
     """List all patients from FHIR. Returns masked-ready patient summaries."""
-    try:
-        patients = fhir.list_patients()
-        return {"status": "ok", "data": patients}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return _cached_list_response(request, ("patients",), fhir.list_patients)
 
 
 DEMO_PATIENTS = [
@@ -861,39 +1063,75 @@ DEMO_PATIENTS = [
 ]
 
 
+def _observation_transaction(patient_id: str, labs: list[tuple]) -> dict:
+    """Build a FHIR transaction Bundle creating one lab Observation per row."""
+    subject = {"reference": f"Patient/{patient_id}"}
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        "resourceType": "Bundle",
+        "type": "transaction",
+        "entry": [
+            {
+                "resource": {
+                    **build_observation_resource(loinc, display, val, unit, ref_lo, ref_hi),
+                    "subject": subject,
+                    "effectiveDateTime": now,
+                },
+                "request": {"method": "POST", "url": "Observation"},
+            }
+            for loinc, display, val, unit, ref_lo, ref_hi in labs
+        ],
+    }
+
+
+async def _existing_patient_ids(families: list[str]) -> dict[tuple[str, str], str]:
+    """Map (given, family) -> patient id with one summary search over the given families."""
+    resp = await fhir.aclient.get("/Patient", params={
+        "family": ",".join(families), "_count": "100", "_summary": "true",
+    })
+    existing = {}
+    while True:
+        resp.raise_for_status()
+        bundle = orjson.loads(resp.content)
+        for e in bundle.get("entry", []):
+            r = e["resource"]
+            name = r.get("name", [{}])[0]
+            given = (name.get("given") or [""])[0]
+            existing.setdefault((given, name.get("family", "")), r["id"])
+        next_url = next((l["url"] for l in bundle.get("link", []) if l.get("relation") == "next"), None)
+        if next_url is None:
+            return existing
+        resp = await fhir.aclient.get(next_url)
+
+
+async def _seed_demo_patient(
+    given: str, family: str, gender: str, dob: str, labs: list, pid: str | None,
+) -> dict:
+    if pid is None:
+        patient = await asyncio.to_thread(fhir.create_patient, family, given, gender, dob)
+        pid = patient["id"]
+
+    # Seed all labs for this patient in one atomic transaction
+    resp = await fhir.aclient.post("/", content=orjson.dumps(_observation_transaction(pid, labs)))
+    resp.raise_for_status()
+
+    return {
+        "patient_id": pid,
+        "name": f"{given} {family}",
+        "labs_created": len(orjson.loads(resp.content).get("entry", [])),
+    }
+
+
 @app.post("/tools/seed_demo_patients")
-def seed_demo_patients():
+async def seed_demo_patients():
     """Seed 4 demo patients with realistic lab data."""
-    try:
-        results = []
-        for given, family, gender, dob, labs in DEMO_PATIENTS:
-            # Check if patient already exists by name
-            existing = fhir.search_patient(family)
-            if any(given in p["name"] for p in existing):
-                pid = next(p["id"] for p in existing if given in p["name"])
-            else:
-                patient = fhir.create_patient(family, given, gender, dob)
-                pid = patient["id"]
-
-            # Seed labs for this patient
-            lab_count = 0
-            for loinc, display, val, unit, ref_lo, ref_hi in labs:
-                fhir.create_observation(
-                    patient_id=pid, encounter_id=None,
-                    loinc_code=loinc, loinc_display=display,
-                    value=val, unit=unit,
-                    reference_low=ref_lo, reference_high=ref_hi,
-                )
-                lab_count += 1
-
-            results.append({
-                "patient_id": pid,
-                "name": f"{given} {family}",
-                "labs_created": lab_count,
-            })
-        return {"status": "ok", "data": {"patients": results, "total": len(results)}}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    existing = await _existing_patient_ids(list({family for _, family, *_ in DEMO_PATIENTS}))
+    results = await asyncio.gather(*(
+        _seed_demo_patient(given, family, gender, dob, labs, existing.get((given, family)))
+        for given, family, gender, dob, labs in DEMO_PATIENTS
+    ))
+    _invalidate_response_caches()
+    return {"status": "ok", "data": {"patients": list(results), "total": len(results)}}
 
 
 # --- Seed Demo Scans (DiagnosticReports with images) ---
@@ -924,83 +1162,128 @@ DEMO_SCANS = {
 }
 
 
+MIME_BY_SUFFIX = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg"}
+
+# Static DiagnosticReport parts, shared by every seeded scan (serialized, never mutated)
+_RADIOLOGY_CATEGORY = ({"coding": [
+    {"system": "http://terminology.hl7.org/CodeSystem/v2-0074", "code": "RAD", "display": "Radiology"},
+]},)
+_IMAGING_REPORT_CODES = {
+    image_type: {"coding": [{"system": "http://loinc.org", "code": code, "display": display}], "text": display}
+    for image_type, (code, display) in LOINC_IMAGING_CODES.items()
+}
+# Identifier system for seeded scans; the filename makes re-seeding idempotent
+DEMO_SCAN_ID_SYSTEM = "urn:medgemma:demo-scan"
+
+
+def _read_file_b64(path: Path) -> tuple[str, int]:
+    """Base64-encode a file straight from an mmap (no intermediate bytes copy).
+
+    Returns (ascii base64 text, size in bytes).
+    """
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return base64.b64encode(mm).decode("ascii"), len(mm)
+
+
 @app.post("/tools/seed_demo_scans")
-def seed_demo_scans():
+async def seed_demo_scans():
     """Seed demo patients with medical imaging DiagnosticReports (images embedded as base64)."""
-    try:
-        # First get patient list to map names to IDs
-        patients_resp = fhir.client.get("/Patient", params={"_count": "100"})
-        patients_resp.raise_for_status()
-        patient_map = {}  # name_prefix -> patient_id
-        for e in patients_resp.json().get("entry", []):
-            r = e["resource"]
-            given = r.get("name", [{}])[0].get("given", [""])[0]
-            patient_map[given] = r["id"]
-
-        results = []
-        for name_prefix, scans in DEMO_SCANS.items():
-            pid = patient_map.get(name_prefix)
-            if not pid:
-                results.append({"name": name_prefix, "error": "Patient not found"})
+    # First get patient list to map names to IDs
+    patients_resp = await fhir.aclient.get("/Patient", params={"_count": "100"})
+    patients_resp.raise_for_status()
+    patient_map = {}  # name_prefix -> patient_id
+    for e in orjson.loads(patients_resp.content).get("entry", []):
+        r = e["resource"]
+        given = r.get("name", [{}])[0].get("given", [""])[0]
+        patient_map[given] = r["id"]
+
+    now_iso = datetime.now(timezone.utc).isoformat()
+    results = []
+    pending = []  # (index into results, resource, detail row) — sent as one transaction below
+    for name_prefix, scans in DEMO_SCANS.items():
+        pid = patient_map.get(name_prefix)
+        if not pid:
+            results.append({"name": name_prefix, "error": "Patient not found"})
+            continue
+
+        for filename, image_type, conclusion in scans:
+            img_path = DEMO_SCANS_DIR / filename
+            if not img_path.exists():
+                results.append({"name": name_prefix, "file": filename, "error": "File not found"})
                 continue
 
-            for filename, image_type, conclusion in scans:
-                img_path = DEMO_SCANS_DIR / filename
-                if not img_path.exists():
-                    results.append({"name": name_prefix, "file": filename, "error": "File not found"})
-                    continue
-
-                # Read image and encode as base64
-                img_data = img_path.read_bytes()
-                img_b64 = base64.b64encode(img_data).decode()
-                mime = "image/png" if filename.endswith(".png") else "image/jpeg"
-
-                # Determine LOINC code
-                loinc_codes = {
-                    "chest_xray": ("36643-5", "XR Chest 2 Views"),
-                    "dermatology": ("72170-4", "Photographic image"),
-                    "pathology": ("60567-5", "Pathology Diagnostic study note"),
-                    "general": ("18748-4", "Diagnostic imaging study"),
-                }
-                code, display = loinc_codes.get(image_type, loinc_codes["general"])
-
-                resource = {
-                    "resourceType": "DiagnosticReport",
-                    "status": "final",
-                    "category": [{"coding": [
-                        {"system": "http://terminology.hl7.org/CodeSystem/v2-0074", "code": "RAD", "display": "Radiology"},
-                    ]}],
-                    "code": {"coding": [{"system": "http://loinc.org", "code": code, "display": display}], "text": display},
-                    "subject": {"reference": f"Patient/{pid}"},
-                    "effectiveDateTime": datetime.now(timezone.utc).isoformat(),
-                    "issued": datetime.now(timezone.utc).isoformat(),
-                    "conclusion": conclusion,
-                    "presentedForm": [
-                        {"contentType": mime, "data": img_b64, "title": filename},
-                        {"contentType": "text/plain", "data": base64.b64encode(conclusion.encode()).decode(), "title": "Report"},
-                    ],
+            # Read image and encode as base64
+            img_b64, img_size = _read_file_b64(img_path)
+            mime = MIME_BY_SUFFIX.get(img_path.suffix.lower(), "image/jpeg")
+
+            resource = {
+                "resourceType": "DiagnosticReport",
+                "status": "final",
+                "category": _RADIOLOGY_CATEGORY,
+                "code": _IMAGING_REPORT_CODES.get(image_type, _IMAGING_REPORT_CODES["general"]),
+                "identifier": [{"system": DEMO_SCAN_ID_SYSTEM, "value": filename}],
+                "subject": {"reference": f"Patient/{pid}"},
+                "effectiveDateTime": now_iso,
+                "issued": now_iso,
+                "conclusion": conclusion,
+                "presentedForm": [
+                    {"contentType": mime, "data": img_b64, "title": filename},
+                    {"contentType": "text/plain", "data": base64.b64encode(conclusion.encode()).decode(), "title": "Report"},
+                ],
+            }
+            results.append(None)
+            pending.append((len(results) - 1, resource, {
+                "patient": name_prefix, "file": filename,
+                "image_type": image_type, "size_kb": img_size // 1024,
+            }))
+
+    if pending:
+        bundle = {
+            "resourceType": "Bundle",
+            "type": "transaction",
+            "entry": [
+                {
+                    "resource": resource,
+                    "request": {
+                        "method": "POST",
+                        "url": "DiagnosticReport",
+                        "ifNoneExist": f"identifier={DEMO_SCAN_ID_SYSTEM}|{row['file']}",
+                    },
                 }
-                resp = fhir.client.post("/DiagnosticReport", json=resource)
-                resp.raise_for_status()
-                created = resp.json()
-                results.append({
-                    "patient": name_prefix, "file": filename, "report_id": created["id"],
-                    "image_type": image_type, "size_kb": len(img_data) // 1024,
-                })
+                for _, resource, row in pending
+            ],
+        }
+        body = orjson.dumps(bundle)
+        # base64 image data deflates back to roughly raw size; level 1 is plenty
+        gz_body = await asyncio.to_thread(gzip.compress, body, 1)
+        resp = await fhir.aclient.post("/", content=gz_body, headers={"Content-Encoding": "gzip"})
+        if resp.status_code == 415:
+            logger.warning("FHIR server rejected gzip request body; resending uncompressed")
+            resp = await fhir.aclient.post("/", content=body)
+        resp.raise_for_status()
+        # transaction-response entries mirror request order; location is "DiagnosticReport/<id>/_history/<n>"
+        # ifNoneExist matches come back as 200 with the existing report's location
+        for (idx, _, row), entry in zip(pending, orjson.loads(resp.content).get("entry", [])):
+            response = entry["response"]
+            results[idx] = {
+                **row,
+                "report_id": response["location"].split("/")[1],
+                "created": response["status"].startswith("201"),
+            }
 
-        return {"status": "ok", "data": {"scans_created": len([r for r in results if "report_id" in r]), "details": results}}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    _invalidate_response_caches()
+    scans_created = sum(1 for r in results if r and r.get("created"))
+    return {"status": "ok", "data": {"scans_created": scans_created, "details": results}}
 
 
 # --- Iteration 12: Agentic SOAP Enhancement (MedGemma + MCP Tools) ---
 
-class EnhanceSOAPRequest(BaseModel):
+class EnhanceSOAPRequest(_RequestModel):
     soap_text: str
     patient_id: str | None = None
 
 
-class EHRNavigateRequest(BaseModel):
+class EHRNavigateRequest(_RequestModel):
     question: str
     patient_id: str
 
@@ -1008,7 +1291,6 @@ class EHRNavigateRequest(BaseModel):
 # ─── EHR Navigator Agent (LangGraph) ────────────────────────
 
 from backend.app.services.ehr_navigator import navigate_ehr, navigate_ehr_stream
-from fastapi.responses import StreamingResponse
 
 
 @app.post("/tools/ehr_navigate")
@@ -1034,8 +1316,6 @@ async def ehr_navigate(req: EHRNavigateRequest):
             status_code=503,
             detail="Cannot connect to llama-server. Run: ./workstation/start_vision.sh",
         )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/tools/ehr_navigate_stream")
@@ -1046,7 +1326,7 @@ async def ehr_navigate_stream(req: EHRNavigateRequest):
     Final line: {"step": "done", "data": {full result}}
     """
     return StreamingResponse(
-        navigate_ehr_stream(req.question, req.patient_id),
+        _coalesce_stream(navigate_ehr_stream(req.question, req.patient_id)),
         media_type="text/event-stream",
         headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
@@ -1059,11 +1339,8 @@ def enhance_soap_endpoint(req: EnhanceSOAPRequest):
     to detect drug interactions, suggest ICD-10 codes, correlate labs,
     and synthesize a clinical summary for physician review.
     """
-    try:
-        result = enhance_soap(req.soap_text, req.patient_id)
-        return {"status": "ok", "data": result.to_dict()}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    result = enhance_soap(req.soap_text, req.patient_id)
+    return {"status": "ok", "data": result.to_dict()}
 
 
 @app.get("/health")
@@ -1073,393 +1350,461 @@ def health():
 
 # --- Dashboard ---
 
+# Shared read-only defaults for the FHIR parsing loops, so missing keys don't
+# allocate a fresh {} / [] per row. Never mutate these.
+_EMPTY: dict = {}
+_EMPTY_SEQ: tuple = ()
+_EMPTY_ITEM: tuple = (_EMPTY,)
+
+# Parsed dashboard rows: slotted so large bundles don't cost a dict per row
+
+@dataclass(frozen=True, slots=True)
+class _PatientRow:
+    id: str
+    name: str
+    gender: str
+    birthDate: str
+    updated: str
+
+
+@dataclass(frozen=True, slots=True)
+class _EncounterRow:
+    id: str
+    patient: str
+    status: str
+    enc_class: str
+    reason: str
+    period: str
+
+
+@dataclass(frozen=True, slots=True)
+class _DocumentRow:
+    id: str
+    patient: str
+    encounter: str
+    status: str
+    date: str
+    preview: str
+    has_content: bool
+
+
+@dataclass(frozen=True, slots=True)
+class _ConditionRow:
+    id: str
+    patient: str
+    encounter: str
+    icd10: str
+    snomed: str
+    description: str
+    date: str
+
+
+@dataclass(frozen=True, slots=True)
+class _MedRequestRow:
+    id: str
+    patient: str
+    encounter: str
+    drug: str
+    rxnorm: str
+    status: str
+    date: str
+
+
+@dataclass(frozen=True, slots=True)
+class _IssueRow:
+    id: str
+    patient: str
+    severity: str
+    detail: str
+    implicated: str
+    mitigation: str
+    date: str
+
+
+@dataclass(frozen=True, slots=True)
+class _DiagReportRow:
+    id: str
+    patient: str
+    loinc: str
+    type: str
+    conclusion: str
+    conclusion_short: str
+    status: str
+    date: str
+
+
+@dataclass(frozen=True, slots=True)
+class _LabRow:
+    id: str
+    patient: str
+    loinc: str
+    test: str
+    value: float | str
+    unit: str
+    ref_range: str
+    interpretation: str
+    date: str
+
+
+# Coding system URI -> short kind used by the dashboard parsers
+_CODE_SYSTEM_KINDS = {
+    "http://hl7.org/fhir/sid/icd-10": "icd10",
+    "http://hl7.org/fhir/sid/icd-10-cm": "icd10",
+    "http://snomed.info/sct": "snomed",
+    "http://www.nlm.nih.gov/research/umls/rxnorm": "rxnorm",
+    "http://loinc.org": "loinc",
+}
+
+
+@lru_cache(maxsize=256)
+def _code_system_kind(system: str) -> str:
+    """Classify a coding system URI, tolerating non-canonical spellings."""
+    kind = _CODE_SYSTEM_KINDS.get(system)
+    if kind is None:
+        lowered = system.lower()
+        kind = next((k for k in ("icd-10", "snomed", "rxnorm", "loinc") if k in lowered), "")
+        kind = kind.replace("-", "")
+    return kind
+
+
+# Rows shown per card; the badge shows the server-side total instead
+_DASHBOARD_PAGE_SIZE = 20
+
+# (resource type, search filter, _elements) per card, in the order the bundles
+# are unpacked below. _elements trims each resource to the fields
+# _render_dashboard reads (HAPI always keeps id and meta), which drops
+# narrative text and extensions.
+_DASHBOARD_CARDS = [
+    ("Patient", "", "name,gender,birthDate"),
+    ("Encounter", "", "subject,status,class,reasonCode,period"),
+    ("DocumentReference", "", "subject,context,status,date,content"),
+    ("Condition", "", "subject,encounter,code,recordedDate"),
+    ("MedicationRequest", "", "subject,encounter,medicationCodeableConcept,status,authoredOn"),
+    ("DetectedIssue", "", "patient,severity,detail,implicated,mitigation,identifiedDateTime"),
+    ("DiagnosticReport", "", "subject,code,conclusion,status,issued"),
+    ("Observation", "category=laboratory&",
+     "subject,code,valueQuantity,referenceRange,interpretation,effectiveDateTime"),
+]
+
+# One row search per card, followed by one _summary=count search per card
+_DASHBOARD_SEARCHES = [
+    f"{rtype}?{flt}_count={_DASHBOARD_PAGE_SIZE}&_sort=-_lastUpdated&_elements={elements}"
+    for rtype, flt, elements in _DASHBOARD_CARDS
+] + [f"{rtype}?{flt}_summary=count" for rtype, flt, _ in _DASHBOARD_CARDS]
+
+
+async def _fetch_dashboard_bundles() -> list[dict]:
+    """Run all dashboard searches in a single FHIR batch request.
+
+    Falls back to issuing the searches concurrently if the server rejects
+    batch Bundles. Returns one searchset Bundle per entry of
+    _DASHBOARD_SEARCHES, in order.
+    """
+    batch = {
+        "resourceType": "Bundle",
+        "type": "batch",
+        "entry": [
+            {"request": {"method": "GET", "url": url}} for url in _DASHBOARD_SEARCHES
+        ],
+    }
+    resp = await fhir.aclient.post("/", content=orjson.dumps(batch))
+    if resp.is_success:
+        # batch-response entries mirror request order; a failed search has no resource
+        return [e.get("resource", {}) for e in orjson.loads(resp.content).get("entry", [])]
+
+    logger.warning("FHIR batch rejected (%s); fetching dashboard searches concurrently",
+                   resp.status_code)
+    responses = await asyncio.gather(
+        *(fhir.aclient.get(f"/{url}") for url in _DASHBOARD_SEARCHES)
+    )
+    for r in responses:
+        r.raise_for_status()
+    return [orjson.loads(r.content) for r in responses]
+
+
+def _nl2br(text: str) -> Markup:
+    return Markup("<br>").join(escape(text).split("\n"))
+
+
+# Compiled once at import; autoescape covers every interpolated FHIR field
+_templates = Environment(
+    loader=FileSystemLoader(Path(__file__).parent / "templates"),
+    autoescape=True,
+    auto_reload=False,
+)
+_templates.filters["nl2br"] = _nl2br
+
+
+class _ImmutableStaticFiles(StaticFiles):
+    """StaticFiles that lets browsers keep assets; URLs carry a content hash."""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=86400, immutable"
+        return response
+
+
+# Dashboard CSS/JS; ?v= changes whenever either file does, so caching them is safe
+_DASHBOARD_STATIC_DIR = Path(__file__).parent / "static"
+app.mount("/dashboard/static", _ImmutableStaticFiles(directory=_DASHBOARD_STATIC_DIR), name="dashboard-static")
+_templates.globals["asset_version"] = hashlib.blake2b(
+    b"".join(f.read_bytes() for f in sorted(_DASHBOARD_STATIC_DIR.iterdir())), digest_size=8,
+).hexdigest()
+_DASHBOARD_TEMPLATE = _templates.get_template("dashboard.html")
+
+# Single-slot cache for the rendered page; refreshed at most every few seconds
+_DASHBOARD_TTL = 5.0
+_dashboard_cache: dict = {"etag": "", "html": "", "expires": 0.0}
+
+
 @app.get("/dashboard", response_class=HTMLResponse)
-def dashboard():
+async def dashboard(request: Request):
     """EMR-style dashboard showing all clinical FHIR resources."""
+    now = time.monotonic()
+    if now >= _dashboard_cache["expires"]:
+        page = await _render_dashboard()
+        digest = hashlib.blake2b(page.encode(), digest_size=16).hexdigest()
+        _dashboard_cache.update(etag=f'"{digest}"', html=page, expires=now + _DASHBOARD_TTL)
+
+    etag = _dashboard_cache["etag"]
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(content=_dashboard_cache["html"], headers=headers)
+
+
+@app.get("/dashboard/doc/{doc_id}")
+async def dashboard_document(doc_id: str, request: Request):
+    """Full SOAP text of one DocumentReference, fetched when a dashboard row is expanded."""
+    resp = await fhir.aclient.get(f"/DocumentReference/{doc_id}", params={"_elements": "content"})
+    if resp.status_code == 404:
+        raise HTTPException(status_code=404, detail="Document not found")
+    resp.raise_for_status()
+    try:
+        encoded = orjson.loads(resp.content)["content"][0]["attachment"]["data"]
+    except (KeyError, IndexError):
+        return PlainTextResponse("(no content)")
+    try:
+        text = base64.b64decode(encoded).decode(errors="replace")
+    except binascii.Error:
+        return PlainTextResponse("(unreadable content)")
+
+    # The document can be amended, so revalidate every time like the dashboard page
+    etag = f'"{hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return PlainTextResponse(text, headers=headers)
+
+
+async def _render_dashboard() -> str:
     # Fetch all data from HAPI FHIR
-    patients_resp = fhir.client.get("/Patient", params={"_count": "100", "_sort": "-_lastUpdated"})
-    encounters_resp = fhir.client.get("/Encounter", params={"_count": "100", "_sort": "-_lastUpdated"})
-    docs_resp = fhir.client.get("/DocumentReference", params={"_count": "100", "_sort": "-_lastUpdated"})
-    conditions_resp = fhir.client.get("/Condition", params={"_count": "100", "_sort": "-_lastUpdated"})
-    medrequests_resp = fhir.client.get("/MedicationRequest", params={"_count": "100", "_sort": "-_lastUpdated"})
-    issues_resp = fhir.client.get("/DetectedIssue", params={"_count": "100", "_sort": "-_lastUpdated"})
-    diagreports_resp = fhir.client.get("/DiagnosticReport", params={"_count": "100", "_sort": "-_lastUpdated"})
-    observations_resp = fhir.client.get("/Observation", params={"category": "laboratory", "_count": "100", "_sort": "-_lastUpdated"})
+    bundles = await _fetch_dashboard_bundles()
+    (
+        patients_bundle, encounters_bundle, docs_bundle, conditions_bundle,
+        medrequests_bundle, issues_bundle, diagreports_bundle, observations_bundle,
+    ) = bundles[:len(_DASHBOARD_CARDS)]
+    count_bundles = bundles[len(_DASHBOARD_CARDS):]
 
     patients = []
-    for e in patients_resp.json().get("entry", []):
+    for e in patients_bundle.get("entry", _EMPTY_SEQ):
         r = e["resource"]
-        name = r.get("name", [{}])[0]
-        patients.append({
-            "id": r["id"],
-            "name": " ".join(name.get("given", []) + [name.get("family", "")]),
-            "gender": r.get("gender", ""),
-            "birthDate": r.get("birthDate", ""),
-            "updated": r.get("meta", {}).get("lastUpdated", "")[:19],
-        })
+        name = r.get("name", _EMPTY_ITEM)[0]
+        patients.append(_PatientRow(
+            id=r["id"],
+            name=" ".join([*name.get("given", _EMPTY_SEQ), name.get("family", "")]),
+            gender=r.get("gender", ""),
+            birthDate=r.get("birthDate", ""),
+            updated=r.get("meta", _EMPTY).get("lastUpdated", "")[:19],
+        ))
 
     encounters = []
-    for e in encounters_resp.json().get("entry", []):
+    for e in encounters_bundle.get("entry", _EMPTY_SEQ):
         r = e["resource"]
         reason = ""
         if r.get("reasonCode"):
             reason = r["reasonCode"][0].get("text", "")
-        subject_ref = r.get("subject", {}).get("reference", "")
-        encounters.append({
-            "id": r["id"],
-            "patient": subject_ref,
-            "status": r.get("status", ""),
-            "class": r.get("class", {}).get("display", r.get("class", {}).get("code", "")),
-            "reason": reason,
-            "period": r.get("period", {}).get("start", "")[:19],
-        })
+        subject_ref = r.get("subject", _EMPTY).get("reference", "")
+        encounters.append(_EncounterRow(
+            id=r["id"],
+            patient=subject_ref,
+            status=r.get("status", ""),
+            enc_class=r.get("class", _EMPTY).get("display", r.get("class", _EMPTY).get("code", "")),
+            reason=reason,
+            period=r.get("period", _EMPTY).get("start", "")[:19],
+        ))
 
     documents = []
-    for e in docs_resp.json().get("entry", []):
+    for e in docs_bundle.get("entry", _EMPTY_SEQ):
         r = e["resource"]
-        subject_ref = r.get("subject", {}).get("reference", "")
-        enc_refs = r.get("context", {}).get("encounter", [])
+        subject_ref = r.get("subject", _EMPTY).get("reference", "")
+        enc_refs = r.get("context", _EMPTY).get("encounter", _EMPTY_SEQ)
         enc_ref = enc_refs[0].get("reference", "") if enc_refs else ""
-        # Decode SOAP text
-        soap_preview = ""
-        soap_full = ""
+        # Preview from the first 204 bytes only; the full note loads on expand
+        has_content = True
         try:
             encoded = r["content"][0]["attachment"]["data"]
-            full_text = base64.b64decode(encoded).decode()
-            soap_preview = full_text[:150].replace("\n", " ") + ("..." if len(full_text) > 150 else "")
-            soap_full = full_text
+            head = base64.b64decode(encoded[:272]).decode(errors="ignore")
+            more = len(head) > 150 or len(encoded) > 272
+            soap_preview = head[:150].replace("\n", " ") + ("..." if more else "")
         except (KeyError, IndexError):
             soap_preview = "(no content)"
-        documents.append({
-            "id": r["id"],
-            "patient": subject_ref,
-            "encounter": enc_ref,
-            "status": r.get("status", ""),
-            "date": r.get("date", "")[:19],
-            "preview": soap_preview,
-            "full_text": soap_full,
-        })
+            has_content = False
+        documents.append(_DocumentRow(
+            id=r["id"],
+            patient=subject_ref,
+            encounter=enc_ref,
+            status=r.get("status", ""),
+            date=r.get("date", "")[:19],
+            preview=soap_preview,
+            has_content=has_content,
+        ))
 
     conditions = []
-    for e in conditions_resp.json().get("entry", []):
+    for e in conditions_bundle.get("entry", _EMPTY_SEQ):
         r = e["resource"]
-        subject_ref = r.get("subject", {}).get("reference", "")
-        enc_ref = r.get("encounter", {}).get("reference", "")
-        codings = r.get("code", {}).get("coding", [])
+        subject_ref = r.get("subject", _EMPTY).get("reference", "")
+        enc_ref = r.get("encounter", _EMPTY).get("reference", "")
+        codings = r.get("code", _EMPTY).get("coding", _EMPTY_SEQ)
         icd_code = ""
         snomed_code = ""
-        description = r.get("code", {}).get("text", "")
+        description = r.get("code", _EMPTY).get("text", "")
         for c in codings:
-            if "icd-10" in c.get("system", ""):
+            kind = _code_system_kind(c.get("system", ""))
+            if kind == "icd10":
                 icd_code = c.get("code", "")
                 if not description:
                     description = c.get("display", "")
-            elif "snomed" in c.get("system", ""):
+            elif kind == "snomed":
                 snomed_code = c.get("code", "")
-        conditions.append({
-            "id": r["id"],
-            "patient": subject_ref,
-            "encounter": enc_ref,
-            "icd10": icd_code,
-            "snomed": snomed_code,
-            "description": description,
-            "date": r.get("recordedDate", "")[:19],
-        })
+        conditions.append(_ConditionRow(
+            id=r["id"],
+            patient=subject_ref,
+            encounter=enc_ref,
+            icd10=icd_code,
+            snomed=snomed_code,
+            description=description,
+            date=r.get("recordedDate", "")[:19],
+        ))
 
     medrequests = []
-    for e in medrequests_resp.json().get("entry", []):
+    for e in medrequests_bundle.get("entry", _EMPTY_SEQ):
         r = e["resource"]
-        subject_ref = r.get("subject", {}).get("reference", "")
-        enc_ref = r.get("encounter", {}).get("reference", "")
-        med = r.get("medicationCodeableConcept", {})
+        subject_ref = r.get("subject", _EMPTY).get("reference", "")
+        enc_ref = r.get("encounter", _EMPTY).get("reference", "")
+        med = r.get("medicationCodeableConcept", _EMPTY)
         drug_name = med.get("text", "")
         rxnorm = ""
-        for c in med.get("coding", []):
-            if "rxnorm" in c.get("system", ""):
+        for c in med.get("coding", _EMPTY_SEQ):
+            if _code_system_kind(c.get("system", "")) == "rxnorm":
                 rxnorm = c.get("code", "")
                 if not drug_name:
                     drug_name = c.get("display", "")
-        medrequests.append({
-            "id": r["id"],
-            "patient": subject_ref,
-            "encounter": enc_ref,
-            "drug": drug_name,
-            "rxnorm": rxnorm,
-            "status": r.get("status", ""),
-            "date": r.get("authoredOn", "")[:19],
-        })
+        medrequests.append(_MedRequestRow(
+            id=r["id"],
+            patient=subject_ref,
+            encounter=enc_ref,
+            drug=drug_name,
+            rxnorm=rxnorm,
+            status=r.get("status", ""),
+            date=r.get("authoredOn", "")[:19],
+        ))
 
     detected_issues = []
-    for e in issues_resp.json().get("entry", []):
+    for e in issues_bundle.get("entry", _EMPTY_SEQ):
         r = e["resource"]
-        patient_ref = r.get("patient", {}).get("reference", "")
+        patient_ref = r.get("patient", _EMPTY).get("reference", "")
         implicated = ", ".join(
-            i.get("reference", "") for i in r.get("implicated", [])
+            i.get("reference", "") for i in r.get("implicated", _EMPTY_SEQ)
         )
         mitigation = ""
         if r.get("mitigation"):
-            mitigation = r["mitigation"][0].get("action", {}).get("text", "")
-        detected_issues.append({
-            "id": r["id"],
-            "patient": patient_ref,
-            "severity": r.get("severity", ""),
-            "detail": r.get("detail", ""),
-            "implicated": implicated,
-            "mitigation": mitigation,
-            "date": r.get("identifiedDateTime", "")[:19],
-        })
+            mitigation = r["mitigation"][0].get("action", _EMPTY).get("text", "")
+        detected_issues.append(_IssueRow(
+            id=r["id"],
+            patient=patient_ref,
+            severity=r.get("severity", ""),
+            detail=r.get("detail", ""),
+            implicated=implicated,
+            mitigation=mitigation,
+            date=r.get("identifiedDateTime", "")[:19],
+        ))
 
     diagreports = []
-    for e in diagreports_resp.json().get("entry", []):
+    for e in diagreports_bundle.get("entry", _EMPTY_SEQ):
         r = e["resource"]
-        subject_ref = r.get("subject", {}).get("reference", "")
+        subject_ref = r.get("subject", _EMPTY).get("reference", "")
         loinc_code = ""
         loinc_display = ""
-        for c in r.get("code", {}).get("coding", []):
-            if "loinc" in c.get("system", ""):
+        for c in r.get("code", _EMPTY).get("coding", _EMPTY_SEQ):
+            if _code_system_kind(c.get("system", "")) == "loinc":
                 loinc_code = c.get("code", "")
                 loinc_display = c.get("display", "")
         conclusion = r.get("conclusion", "")
         conclusion_short = conclusion[:120] + ("..." if len(conclusion) > 120 else "")
-        diagreports.append({
-            "id": r["id"],
-            "patient": subject_ref,
-            "loinc": loinc_code,
-            "type": loinc_display,
-            "conclusion": conclusion,
-            "conclusion_short": conclusion_short,
-            "status": r.get("status", ""),
-            "date": r.get("issued", "")[:19],
-        })
+        diagreports.append(_DiagReportRow(
+            id=r["id"],
+            patient=subject_ref,
+            loinc=loinc_code,
+            type=loinc_display,
+            conclusion=conclusion,
+            conclusion_short=conclusion_short,
+            status=r.get("status", ""),
+            date=r.get("issued", "")[:19],
+        ))
 
     lab_observations = []
-    for e in observations_resp.json().get("entry", []):
+    for e in observations_bundle.get("entry", _EMPTY_SEQ):
         r = e["resource"]
-        subject_ref = r.get("subject", {}).get("reference", "")
-        coding = r.get("code", {}).get("coding", [{}])[0]
-        vq = r.get("valueQuantity", {})
-        ref_range = r.get("referenceRange", [{}])[0] if r.get("referenceRange") else {}
-        interp = (r.get("interpretation", [{}])[0].get("coding", [{}])[0].get("code", "N"))
-        ref_lo = ref_range.get("low", {}).get("value", "")
-        ref_hi = ref_range.get("high", {}).get("value", "")
+        subject_ref = r.get("subject", _EMPTY).get("reference", "")
+        coding = r.get("code", _EMPTY).get("coding", _EMPTY_ITEM)[0]
+        vq = r.get("valueQuantity", _EMPTY)
+        ref_range = (r.get("referenceRange") or _EMPTY_ITEM)[0]
+        interp = (r.get("interpretation", _EMPTY_ITEM)[0].get("coding", _EMPTY_ITEM)[0].get("code", "N"))
+        ref_lo = ref_range.get("low", _EMPTY).get("value", "")
+        ref_hi = ref_range.get("high", _EMPTY).get("value", "")
         ref_str = f"{ref_lo}-{ref_hi}" if ref_lo != "" and ref_hi != "" else "--"
-        lab_observations.append({
-            "id": r["id"],
-            "patient": subject_ref,
-            "loinc": coding.get("code", ""),
-            "test": coding.get("display", r.get("code", {}).get("text", "")),
-            "value": vq.get("value", ""),
-            "unit": vq.get("unit", ""),
-            "ref_range": ref_str,
-            "interpretation": interp,
-            "date": r.get("effectiveDateTime", "")[:19],
-        })
+        lab_observations.append(_LabRow(
+            id=r["id"],
+            patient=subject_ref,
+            loinc=coding.get("code", ""),
+            test=coding.get("display", r.get("code", _EMPTY).get("text", "")),
+            value=vq.get("value", ""),
+            unit=vq.get("unit", ""),
+            ref_range=ref_str,
+            interpretation=interp,
+            date=r.get("effectiveDateTime", "")[:19],
+        ))
+
+    # Badge totals; if a count search failed, fall back to the rows we have
+    cards = {
+        "patients": patients, "encounters": encounters, "documents": documents,
+        "conditions": conditions, "medrequests": medrequests,
+        "detected_issues": detected_issues, "diagreports": diagreports,
+        "lab_observations": lab_observations,
+    }
+    totals = {
+        name: counted.get("total", len(rows))
+        for (name, rows), counted in zip(cards.items(), count_bundles)
+    }
+
+    return _DASHBOARD_TEMPLATE.render(
+        totals=totals,
+        patients=patients,
+        encounters=encounters,
+        documents=documents,
+        conditions=conditions,
+        medrequests=medrequests,
+        detected_issues=detected_issues,
+        diagreports=diagreports,
+        lab_observations=lab_observations,
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
 
-    # Build HTML
-    patient_rows = ""
-    for p in patients:
-        patient_rows += f"""<tr>
-            <td>{p['id']}</td><td><strong>{p['name']}</strong></td>
-            <td>{p['gender']}</td><td>{p['birthDate']}</td><td>{p['updated']}</td>
-        </tr>"""
-
-    encounter_rows = ""
-    for e in encounters:
-        encounter_rows += f"""<tr>
-            <td>{e['id']}</td><td>{e['patient']}</td><td>{e['status']}</td>
-            <td>{e['class']}</td><td>{e['reason']}</td><td>{e['period']}</td>
-        </tr>"""
-
-    doc_rows = ""
-    import html as html_mod
-    for i, d in enumerate(documents):
-        escaped_full = html_mod.escape(d['full_text']).replace("\n", "<br>") if d['full_text'] else d['preview']
-        doc_rows += f"""<tr>
-            <td>{d['id']}</td><td>{d['patient']}</td><td>{d['encounter']}</td>
-            <td>{d['status']}</td><td>{d['date']}</td>
-            <td class="soap-cell">
-                <div class="soap-preview" id="preview-{i}" onclick="toggleSoap({i})">{d['preview']} <span class="expand-hint">[expand]</span></div>
-                <div class="soap-full" id="full-{i}" onclick="toggleSoap({i})" style="display:none">{escaped_full} <span class="expand-hint">[collapse]</span></div>
-            </td>
-        </tr>"""
-
-    condition_rows = ""
-    for c in conditions:
-        condition_rows += f"""<tr>
-            <td>{c['id']}</td><td>{c['patient']}</td><td>{c['encounter']}</td>
-            <td><strong>{c['icd10']}</strong></td><td>{c['snomed']}</td>
-            <td>{c['description']}</td><td>{c['date']}</td>
-        </tr>"""
-
-    medrequest_rows = ""
-    for m in medrequests:
-        medrequest_rows += f"""<tr>
-            <td>{m['id']}</td><td>{m['patient']}</td><td>{m['encounter']}</td>
-            <td><strong>{m['drug']}</strong></td><td>{m['rxnorm']}</td>
-            <td>{m['status']}</td><td>{m['date']}</td>
-        </tr>"""
-
-    issue_rows = ""
-    for i in detected_issues:
-        sev_class = "color:#c62828;font-weight:600" if i['severity'] == 'high' else "color:#e65100;font-weight:600"
-        issue_rows += f"""<tr>
-            <td>{i['id']}</td><td>{i['patient']}</td>
-            <td style="{sev_class}">{i['severity']}</td>
-            <td>{i['detail']}</td><td>{i['implicated']}</td>
-            <td>{i['mitigation']}</td><td>{i['date']}</td>
-        </tr>"""
-
-    diagreport_rows = ""
-    for idx, dr in enumerate(diagreports):
-        escaped_conclusion = html_mod.escape(dr['conclusion']).replace("\n", "<br>")
-        diagreport_rows += f"""<tr>
-            <td>{dr['id']}</td><td>{dr['patient']}</td><td>{dr['loinc']}</td>
-            <td>{dr['type']}</td><td>{dr['status']}</td><td>{dr['date']}</td>
-            <td class="soap-cell">
-                <div class="soap-preview" id="dr-preview-{idx}" onclick="toggleDR({idx})">{dr['conclusion_short']} <span class="expand-hint">[expand]</span></div>
-                <div class="soap-full" id="dr-full-{idx}" onclick="toggleDR({idx})" style="display:none">{escaped_conclusion} <span class="expand-hint">[collapse]</span></div>
-            </td>
-        </tr>"""
-
-    lab_rows = ""
-    for lab in lab_observations:
-        flag = lab['interpretation']
-        flag_color = "#c62828" if flag in ("H", "HH") else "#e65100" if flag in ("L", "LL") else "#2e7d32"
-        flag_bg = "#ffebee" if flag in ("H", "HH") else "#fff3e0" if flag in ("L", "LL") else "#e8f5e9"
-        lab_rows += f"""<tr>
-            <td>{lab['id']}</td><td>{lab['patient']}</td><td>{lab['loinc']}</td>
-            <td>{lab['test']}</td><td><strong>{lab['value']}</strong> {lab['unit']}</td>
-            <td>{lab['ref_range']}</td>
-            <td><span style="background:{flag_bg};color:{flag_color};padding:2px 8px;border-radius:4px;font-weight:700;font-size:12px">{flag}</span></td>
-            <td>{lab['date']}</td>
-        </tr>"""
-
-    html = f"""<!DOCTYPE html>
-<html>
-<head>
-    <title>MedGemma FHIR Dashboard</title>
-    <style>
-        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-        body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; background: #f0f2f5; color: #1a1a2e; }}
-        .header {{ background: linear-gradient(135deg, #0f4c75, #1b262c); color: white; padding: 20px 32px; }}
-        .header h1 {{ font-size: 22px; font-weight: 600; }}
-        .header p {{ font-size: 13px; opacity: 0.8; margin-top: 4px; }}
-        .container {{ max-width: 1200px; margin: 0 auto; padding: 24px; }}
-        .card {{ background: white; border-radius: 10px; box-shadow: 0 1px 3px rgba(0,0,0,0.1); margin-bottom: 24px; overflow: hidden; }}
-        .card-header {{ padding: 16px 20px; border-bottom: 1px solid #e8e8e8; display: flex; align-items: center; gap: 10px; }}
-        .card-header h2 {{ font-size: 16px; font-weight: 600; }}
-        .badge {{ background: #e3f2fd; color: #1565c0; padding: 2px 10px; border-radius: 12px; font-size: 12px; font-weight: 600; }}
-        table {{ width: 100%; border-collapse: collapse; font-size: 13px; }}
-        th {{ text-align: left; padding: 10px 16px; background: #fafafa; color: #666; font-weight: 600; text-transform: uppercase; font-size: 11px; letter-spacing: 0.5px; }}
-        td {{ padding: 10px 16px; border-top: 1px solid #f0f0f0; }}
-        tr:hover td {{ background: #f8f9ff; }}
-        .status-finished {{ color: #2e7d32; font-weight: 600; }}
-        .status-current {{ color: #1565c0; font-weight: 600; }}
-        .empty {{ padding: 32px; text-align: center; color: #999; }}
-        .refresh {{ float: right; background: #0f4c75; color: white; border: none; padding: 8px 16px; border-radius: 6px; cursor: pointer; font-size: 13px; }}
-        .refresh:hover {{ background: #1b6ca8; }}
-        .soap-cell {{ max-width: 450px; }}
-        .soap-preview {{ cursor: pointer; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }}
-        .soap-full {{ cursor: pointer; white-space: pre-wrap; word-break: break-word; max-height: 400px; overflow-y: auto; padding: 8px; background: #f8f9fa; border-radius: 6px; font-size: 12px; line-height: 1.5; }}
-        .expand-hint {{ color: #1565c0; font-size: 11px; font-weight: 600; }}
-    </style>
-    <script>
-        function toggleSoap(i) {{
-            var preview = document.getElementById('preview-' + i);
-            var full = document.getElementById('full-' + i);
-            if (full.style.display === 'none') {{
-                preview.style.display = 'none';
-                full.style.display = 'block';
-            }} else {{
-                full.style.display = 'none';
-                preview.style.display = 'block';
-            }}
-        }}
-        function toggleDR(i) {{
-            var preview = document.getElementById('dr-preview-' + i);
-            var full = document.getElementById('dr-full-' + i);
-            if (full.style.display === 'none') {{
-                preview.style.display = 'none';
-                full.style.display = 'block';
-            }} else {{
-                full.style.display = 'none';
-                preview.style.display = 'block';
-            }}
-        }}
-    </script>
-</head>
-<body>
-    <div class="header">
-        <h1>MedGemma Clinical Dashboard</h1>
-        <p>FHIR R4 Store &mdash; HAPI FHIR 8.6.0</p>
-    </div>
-    <div class="container">
-        <button class="refresh" onclick="location.reload()">Refresh</button>
-
-        <div class="card">
-            <div class="card-header">
-                <h2>Patients</h2>
-                <span class="badge">{len(patients)}</span>
-            </div>
-            {"<table><tr><th>ID</th><th>Name</th><th>Gender</th><th>Birth Date</th><th>Last Updated</th></tr>" + patient_rows + "</table>" if patients else '<div class="empty">No patients yet</div>'}
-        </div>
-
-        <div class="card">
-            <div class="card-header">
-                <h2>Encounters</h2>
-                <span class="badge">{len(encounters)}</span>
-            </div>
-            {"<table><tr><th>ID</th><th>Patient</th><th>Status</th><th>Class</th><th>Reason</th><th>Date</th></tr>" + encounter_rows + "</table>" if encounters else '<div class="empty">No encounters yet</div>'}
-        </div>
-
-        <div class="card">
-            <div class="card-header">
-                <h2>SOAP Notes (DocumentReference)</h2>
-                <span class="badge">{len(documents)}</span>
-            </div>
-            {"<table><tr><th>ID</th><th>Patient</th><th>Encounter</th><th>Status</th><th>Date</th><th>Preview</th></tr>" + doc_rows + "</table>" if documents else '<div class="empty">No documents yet</div>'}
-        </div>
-
-        <div class="card">
-            <div class="card-header">
-                <h2>Conditions (Diagnoses)</h2>
-                <span class="badge">{len(conditions)}</span>
-            </div>
-            {"<table><tr><th>ID</th><th>Patient</th><th>Encounter</th><th>ICD-10</th><th>SNOMED</th><th>Description</th><th>Date</th></tr>" + condition_rows + "</table>" if conditions else '<div class="empty">No conditions yet</div>'}
-        </div>
-
-        <div class="card">
-            <div class="card-header">
-                <h2>Medication Requests</h2>
-                <span class="badge">{len(medrequests)}</span>
-            </div>
-            {"<table><tr><th>ID</th><th>Patient</th><th>Encounter</th><th>Drug</th><th>RxNorm</th><th>Status</th><th>Date</th></tr>" + medrequest_rows + "</table>" if medrequests else '<div class="empty">No medication requests yet</div>'}
-        </div>
-
-        <div class="card">
-            <div class="card-header">
-                <h2>Detected Issues (Safety Alerts)</h2>
-                <span class="badge">{len(detected_issues)}</span>
-            </div>
-            {"<table><tr><th>ID</th><th>Patient</th><th>Severity</th><th>Detail</th><th>Implicated</th><th>Mitigation</th><th>Date</th></tr>" + issue_rows + "</table>" if detected_issues else '<div class="empty">No detected issues yet</div>'}
-        </div>
-
-        <div class="card">
-            <div class="card-header">
-                <h2>Diagnostic Reports (Radiology)</h2>
-                <span class="badge">{len(diagreports)}</span>
-            </div>
-            {"<table><tr><th>ID</th><th>Patient</th><th>LOINC</th><th>Type</th><th>Status</th><th>Date</th><th>Conclusion</th></tr>" + diagreport_rows + "</table>" if diagreports else '<div class="empty">No diagnostic reports yet</div>'}
-        </div>
-
-        <div class="card">
-            <div class="card-header">
-                <h2>Lab Results (Observations)</h2>
-                <span class="badge">{len(lab_observations)}</span>
-            </div>
-            {"<table><tr><th>ID</th><th>Patient</th><th>LOINC</th><th>Test</th><th>Value</th><th>Ref Range</th><th>Flag</th><th>Date</th></tr>" + lab_rows + "</table>" if lab_observations else '<div class="empty">No lab observations yet</div>'}
-        </div>
-    </div>
-</body>
-</html>"""
-    return HTMLResponse(content=html)
+    # uvloop + httptools ship with uvicorn[standard]; pin them explicitly rather
+    # than relying on "auto" so a missing extra fails loudly instead of silently
+    # falling back to asyncio + h11.
+    uvicorn.run(app, host="0.0.0.0", port=8082, loop="uvloop", http="httptools")
@@ -0,0 +1,30 @@
+function toggleSoap(i) {
+    var preview = document.getElementById('preview-' + i);
+    var full = document.getElementById('full-' + i);
+    var docId = full.dataset.docId;
+    if (docId && !full.dataset.loaded) {
+        // Full note is fetched on first expand; the page only ships the preview
+        full.dataset.loaded = '1';
+        fetch('/dashboard/doc/' + encodeURIComponent(docId))
+            .then(function (r) { return r.ok ? r.text() : '(failed to load note)'; })
+            .then(function (t) { full.querySelector('.soap-text').textContent = t; });
+    }
+    if (full.style.display === 'none') {
+        preview.style.display = 'none';
+        full.style.display = 'block';
+    } else {
+        full.style.display = 'none';
+        preview.style.display = 'block';
+    }
+}
+function toggleDR(i) {
+    var preview = document.getElementById('dr-preview-' + i);
+    var full = document.getElementById('dr-full-' + i);
+    if (full.style.display === 'none') {
+        preview.style.display = 'none';
+        full.style.display = 'block';
+    } else {
+        full.style.display = 'none';
+        preview.style.display = 'block';
+    }
+}
@@ -9,142 +9,307 @@ Usage:
 
 Or set environment variables:
     NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+
+Server-side load (DDI_data.csv copied into the Neo4j import/ directory):
+    python load_ddi.py --password <password> --load-csv file:///DDI_data.csv
 """
 
 import os
-import csv
+import time
+import random
 import argparse
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 from typing import Generator
+import pyarrow as pa
+import pyarrow.csv as pacsv
 from neo4j import GraphDatabase
+from neo4j.exceptions import TransientError
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
 
-def read_ddi_csv(file_path: Path, batch_size: int = 5000) -> Generator[list, None, None]:
-    """Read DDI CSV in batches to avoid memory issues."""
-    batch = []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            batch.append(row)
-            if len(batch) >= batch_size:
-                yield batch
-                batch = []
-        if batch:
-            yield batch
+# Bulk-load statements. Rows travel as positional lists rather than maps to skip
+# per-row dicts; only the parameters change between batches, so the server plans
+# each statement once. DDILoader.batched() upgrades the drug subquery batching to
+# IN CONCURRENT TRANSACTIONS where the server supports it.
+CYPHER_UPSERT_DRUGS = """
+    UNWIND $drugs AS drug
+    CALL {
+        WITH drug
+        MERGE (d:Drug {drugbank_id: drug[0]})
+        ON CREATE SET d.name = drug[1]
+    } IN TRANSACTIONS OF 1000 ROWS
+"""
+
+CYPHER_UPSERT_INTERACTIONS = """
+    UNWIND $interactions AS i
+    CALL {
+        WITH i
+        MATCH (d1:Drug {drugbank_id: i[0]})
+        MATCH (d2:Drug {drugbank_id: i[1]})
+        MERGE (d1)-[r:INTERACTS_WITH]->(d2)
+        ON CREATE SET r.interaction_type = i[2]
+    } IN TRANSACTIONS OF 1000 ROWS
+"""
+
+# Reload variant that also corrects changed types, writing only edges that differ
+CYPHER_UPDATE_INTERACTIONS = """
+    UNWIND $interactions AS i
+    CALL {
+        WITH i
+        MATCH (d1:Drug {drugbank_id: i[0]})
+        MATCH (d2:Drug {drugbank_id: i[1]})
+        MERGE (d1)-[r:INTERACTS_WITH]->(d2)
+        WITH r, i
+        WHERE r.interaction_type IS NULL OR r.interaction_type <> i[2]
+        SET r.interaction_type = i[2]
+    } IN TRANSACTIONS OF 1000 ROWS
+"""
+
+# Server-side variants for --load-csv: Neo4j reads the file itself, so no rows
+# cross Bolt. Kept serial: the same drug appears on many rows, and concurrent
+# batches would contend for its lock.
+CYPHER_LOAD_CSV_DRUGS = """
+    LOAD CSV WITH HEADERS FROM $url AS row
+    CALL {
+        WITH row
+        MERGE (d1:Drug {drugbank_id: row.drug1_id})
+        ON CREATE SET d1.name = row.drug1_name
+        MERGE (d2:Drug {drugbank_id: row.drug2_id})
+        ON CREATE SET d2.name = row.drug2_name
+    } IN TRANSACTIONS OF 10000 ROWS
+"""
+
+CYPHER_LOAD_CSV_INTERACTIONS = """
+    LOAD CSV WITH HEADERS FROM $url AS row
+    CALL {
+        WITH row
+        MATCH (d1:Drug {drugbank_id: row.drug1_id})
+        MATCH (d2:Drug {drugbank_id: row.drug2_id})
+        MERGE (d1)-[r:INTERACTS_WITH]->(d2)
+        ON CREATE SET r.interaction_type = row.interaction_type
+    } IN TRANSACTIONS OF 10000 ROWS
+"""
+
+# Parallel interaction batches; each worker thread gets its own session. Kept
+# small: every relationship MERGE locks both endpoint drugs, and batches share
+# drugs heavily, so more workers mostly buys more deadlock retries.
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+# 64 MiB blocks: each RecordBatch covers a large slice of the file
+_CSV_BLOCK_SIZE = 64 << 20
+
+
+def _open_ddi_csv(file_path: Path, columns: list[str]) -> pacsv.CSVStreamingReader:
+    """Stream the named DDI CSV columns as string RecordBatches (parsed in C, multithreaded)."""
+    return pacsv.open_csv(
+        file_path,
+        read_options=pacsv.ReadOptions(block_size=_CSV_BLOCK_SIZE),
+        # Quoted descriptions may span lines, as csv.DictReader accepted
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=columns,
+            column_types=dict.fromkeys(columns, pa.string()),
+        ),
+    )
+
+
+def collect_drugs(file_path: Path) -> dict[str, str]:
+    """Collect every distinct drug in the DDI CSV as {drugbank_id: name} (first name wins)."""
+    drugs = {}
+    columns = ['drug1_id', 'drug1_name', 'drug2_id', 'drug2_name']
+    for record_batch in _open_ddi_csv(file_path, columns):
+        for id1, name1, id2, name2 in zip(*(record_batch.column(c).to_pylist() for c in columns)):
+            drugs.setdefault(id1, name1)
+            drugs.setdefault(id2, name2)
+    return drugs
+
+
+def iter_interactions(file_path: Path, batch_size: int = 20000,
+                      undirected: bool = False) -> Generator[list, None, None]:
+    """
+    Read DDI interactions in batches of (drug1_id, drug2_id, interaction_type).
+
+    With undirected=True, self-interactions are dropped and (A, B, type) and
+    (B, A, type) are emitted once, in whichever direction appears first.
+    """
+    columns = ['drug1_id', 'drug2_id', 'interaction_type']
+    seen = set()
+    for record_batch in _open_ddi_csv(file_path, columns):
+        for offset in range(0, record_batch.num_rows, batch_size):
+            chunk = record_batch.slice(offset, batch_size)
+            rows = list(zip(*(chunk.column(c).to_pylist() for c in columns)))
+            if undirected:
+                kept = []
+                for row in rows:
+                    id1, id2, interaction_type = row
+                    if id1 == id2:
+                        continue
+                    key = (id1, id2, interaction_type) if id1 < id2 else (id2, id1, interaction_type)
+                    if key not in seen:
+                        seen.add(key)
+                        kept.append(row)
+                rows = kept
+            if rows:
+                yield rows
 
 
 class DDILoader:
     def __init__(self, uri: str, user: str, password: str):
         self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        # One session for the loader's lifetime; every query below runs on it
+        self._session = self.driver.session()
+        # Sessions aren't thread-safe: parallel batches each use a per-thread one
+        self._local = threading.local()
+        self._worker_sessions = []
+        self._worker_lock = threading.Lock()
 
     def close(self):
+        for session in self._worker_sessions:
+            session.close()
+        self._session.close()
         self.driver.close()
 
-    def create_constraints(self):
-        """Create unique constraints and indexes for performance."""
-        with self.driver.session() as session:
-            # Unique constraint on Drug drugbank_id
-            session.run("""
-                CREATE CONSTRAINT drug_id IF NOT EXISTS
-                FOR (d:Drug) REQUIRE d.drugbank_id IS UNIQUE
-            """)
-
-            # Index on drug name for fast lookups
-            session.run("""
-                CREATE INDEX drug_name IF NOT EXISTS
-                FOR (d:Drug) ON (d.name)
-            """)
-
-            # Full-text index for fuzzy drug name search
-            session.run("""
-                CREATE FULLTEXT INDEX drug_name_fulltext IF NOT EXISTS
-                FOR (d:Drug) ON EACH [d.name]
-            """)
-
-            print("Created constraints and indexes")
-
-    def load_drugs_and_interactions(self, file_path: Path):
-        """Load all drugs and their interactions from DDI CSV."""
-        total_drugs = set()
+    def _worker_session(self):
+        """Session owned by the calling worker thread, opened on first use."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self.driver.session()
+            with self._worker_lock:
+                self._worker_sessions.append(session)
+        return session
+
+    def _run_batch(self, query: str, retries: int = 6, **params):
+        """Run one write batch on this thread's session, retrying lock-contention deadlocks."""
+        for attempt in range(retries):
+            try:
+                return self._worker_session().run(query, **params).consume()
+            except TransientError:
+                if attempt == retries - 1:
+                    raise
+                # Exponential backoff with full jitter so colliding workers spread out
+                time.sleep(random.uniform(0, 0.1 * 2 ** attempt))
+
+    def server_version(self) -> tuple[int, ...]:
+        """Neo4j kernel version, e.g. (5, 21, 0)."""
+        record = self._session.run(
+            "CALL dbms.components() YIELD name, versions "
+            "WHERE name = 'Neo4j Kernel' RETURN versions[0] AS version"
+        ).single()
+        return tuple(int(p) for p in record["version"].split("-")[0].split(".") if p.isdigit())
+
+    def batched(self, *queries: str) -> list[str]:
+        """Run subquery batches concurrently on Neo4j 5.21+; leave them serial before that."""
+        if self.server_version() >= (5, 21):
+            return [q.replace("IN TRANSACTIONS", "IN CONCURRENT TRANSACTIONS") for q in queries]
+        return list(queries)
+
+    def create_uniqueness_constraints(self):
+        """Create the drugbank_id uniqueness constraint (before loading; MERGE relies on it)."""
+        self._session.run("""
+            CREATE CONSTRAINT drug_id IF NOT EXISTS
+            FOR (d:Drug) REQUIRE d.drugbank_id IS UNIQUE
+        """)
+
+        print("Created uniqueness constraint")
+
+    def create_secondary_indexes(self):
+        """Create name indexes after loading, so they are built once rather than per insert."""
+        # Index on drug name for fast lookups
+        self._session.run("""
+            CREATE INDEX drug_name IF NOT EXISTS
+            FOR (d:Drug) ON (d.name)
+        """)
+
+        # Full-text index for fuzzy drug name search
+        self._session.run("""
+            CREATE FULLTEXT INDEX drug_name_fulltext IF NOT EXISTS
+            FOR (d:Drug) ON EACH [d.name]
+        """)
+
+        # Index population is asynchronous; block until they are ONLINE
+        self._session.run("CALL db.awaitIndexes(600)").consume()
+
+        print("Created secondary indexes")
+
+    def load_drugs_and_interactions(self, file_path: Path, workers: int = DEFAULT_WORKERS,
+                                    update_types: bool = False, undirected: bool = False):
+        """
+        Load all drugs, then all interactions, from DDI CSV (two passes over the file).
+
+        Existing edges keep their interaction_type unless update_types is set.
+        With undirected set, symmetric duplicates are collapsed to one edge.
+        """
         total_interactions = 0
-
-        with self.driver.session() as session:
-            for batch_num, batch in enumerate(read_ddi_csv(file_path)):
-                # Collect unique drugs from batch
-                drugs = {}
-                for row in batch:
-                    drugs[row['drug1_id']] = row['drug1_name']
-                    drugs[row['drug2_id']] = row['drug2_name']
-
-                # Create drug nodes
-                session.run("""
-                    UNWIND $drugs AS drug
-                    MERGE (d:Drug {drugbank_id: drug.id})
-                    ON CREATE SET d.name = drug.name
-                """, drugs=[{"id": k, "name": v} for k, v in drugs.items()])
-
-                # Create interactions (using exact CSV column name)
-                interactions = [
-                    {
-                        "drug1_id": row['drug1_id'],
-                        "drug2_id": row['drug2_id'],
-                        "interaction_type": row['interaction_type']
-                    }
-                    for row in batch
-                ]
-
-                session.run("""
-                    UNWIND $interactions AS i
-                    MATCH (d1:Drug {drugbank_id: i.drug1_id})
-                    MATCH (d2:Drug {drugbank_id: i.drug2_id})
-                    MERGE (d1)-[r:INTERACTS_WITH]->(d2)
-                    ON CREATE SET r.interaction_type = i.interaction_type
-                    ON MATCH SET r.interaction_type = i.interaction_type
-                """, interactions=interactions)
-
-                total_drugs.update(drugs.keys())
-                total_interactions += len(batch)
-
-                print(f"Batch {batch_num + 1}: Loaded {len(drugs)} drugs, {len(batch)} interactions")
-
-        return len(total_drugs), total_interactions
+        # Drugs are deduplicated, so their inner transactions never contend and can
+        # run concurrently; interaction batches already run on parallel workers and
+        # keep serial inner transactions to limit lock contention on shared drugs
+        upsert_drugs, = self.batched(CYPHER_UPSERT_DRUGS)
+        upsert_interactions = CYPHER_UPDATE_INTERACTIONS if update_types else CYPHER_UPSERT_INTERACTIONS
+
+        # CALL { ... } IN TRANSACTIONS needs auto-commit queries, i.e. session.run
+        # Phase 1: every drug node once, so the relationship pass never re-MERGEs them
+        drugs = collect_drugs(file_path)
+        self._session.run(upsert_drugs, drugs=list(drugs.items())).consume()
+        print(f"Loaded {len(drugs)} drugs")
+
+        # Phase 2: interactions only; both ends already exist and are indexed, so
+        # batches run in parallel. At most 2x workers batches are held in memory.
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            in_flight = set()
+            for batch_num, interactions in enumerate(iter_interactions(file_path, undirected=undirected)):
+                if len(in_flight) >= workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                in_flight.add(pool.submit(self._run_batch, upsert_interactions, interactions=interactions))
+
+                total_interactions += len(interactions)
+                print(f"Batch {batch_num + 1}: Queued {len(interactions)} interactions")
+            for future in in_flight:
+                future.result()
+
+        return len(drugs), total_interactions
+
+    def load_csv_server_side(self, url: str):
+        """Have Neo4j read the DDI CSV at url itself: drugs first, then interactions."""
+        self._session.run(CYPHER_LOAD_CSV_DRUGS, url=url).consume()
+        self._session.run(CYPHER_LOAD_CSV_INTERACTIONS, url=url).consume()
 
     def verify_load(self):
         """Verify the data was loaded correctly."""
-        with self.driver.session() as session:
-            # Count nodes
-            result = session.run("MATCH (d:Drug) RETURN count(d) as count")
-            drug_count = result.single()["count"]
-
-            # Count relationships
-            result = session.run("MATCH ()-[r:INTERACTS_WITH]->() RETURN count(r) as count")
-            interaction_count = result.single()["count"]
-
-            # Count by interaction_type (top 10)
-            result = session.run("""
-                MATCH ()-[r:INTERACTS_WITH]->()
-                RETURN r.interaction_type as interaction_type, count(r) as count
-                ORDER BY count DESC
-                LIMIT 10
-            """)
-            top_types = {row["interaction_type"]: row["count"] for row in result}
-
-            return drug_count, interaction_count, top_types
+        # Count nodes
+        result = self._session.run("MATCH (d:Drug) RETURN count(d) as count")
+        drug_count = result.single()["count"]
+
+        # Count relationships
+        result = self._session.run("MATCH ()-[r:INTERACTS_WITH]->() RETURN count(r) as count")
+        interaction_count = result.single()["count"]
+
+        # Count by interaction_type (top 10)
+        result = self._session.run("""
+            MATCH ()-[r:INTERACTS_WITH]->()
+            RETURN r.interaction_type as interaction_type, count(r) as count
+            ORDER BY count DESC
+            LIMIT 10
+        """)
+        top_types = {row["interaction_type"]: row["count"] for row in result}
+
+        return drug_count, interaction_count, top_types
 
     def test_query(self, drug_names: list[str]):
         """Test query: Find interactions between given drugs."""
-        with self.driver.session() as session:
-            result = session.run("""
-                MATCH (d1:Drug)-[r:INTERACTS_WITH]->(d2:Drug)
-                WHERE toLower(d1.name) IN $names AND toLower(d2.name) IN $names
-                RETURN d1.name as drug1, d2.name as drug2,
-                       r.interaction_type as interaction_type
-            """, names=[n.lower() for n in drug_names])
-            return list(result)
+        result = self._session.run("""
+            MATCH (d1:Drug)-[r:INTERACTS_WITH]->(d2:Drug)
+            WHERE toLower(d1.name) IN $names AND toLower(d2.name) IN $names
+            RETURN d1.name as drug1, d2.name as drug2,
+                   r.interaction_type as interaction_type
+        """, names=[n.lower() for n in drug_names])
+        return list(result)
 
 
 def main():
@@ -155,8 +320,21 @@ def main():
     parser.add_argument("--data-file", default=None, help="Path to DDI_data.csv")
     parser.add_argument("--verify-only", action="store_true", help="Only verify existing data")
     parser.add_argument("--test-drugs", nargs="+", help="Test query with drug names")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Parallel interaction batches")
+    parser.add_argument("--update-types", action="store_true",
+                        help="Also rewrite interaction_type on existing edges that differ")
+    parser.add_argument("--undirected", action="store_true",
+                        help="Store one edge per symmetric interaction pair and skip self-interactions")
+    parser.add_argument("--load-csv", metavar="URL",
+                        help="Server-side LOAD CSV from a URL Neo4j can read, e.g. file:///DDI_data.csv")
     args = parser.parse_args()
 
+    if args.load_csv and args.update_types:
+        parser.error("--update-types is not supported with --load-csv")
+    if args.load_csv and args.undirected:
+        parser.error("--undirected is not supported with --load-csv")
+
     if not args.password:
         print("Error: Neo4j password required. Set NEO4J_PASSWORD env var or use --password")
         return 1
@@ -190,19 +368,31 @@ def main():
                 print(f"    {itype}: {count}")
             return 0
 
-        if not data_file.exists():
-            print(f"Error: Data file not found: {data_file}")
-            return 1
+        if args.load_csv:
+            print(f"Loading DDI data server-side from: {args.load_csv}")
+            print(f"Connecting to: {args.uri}")
+            loader.create_uniqueness_constraints()
+            loader.load_csv_server_side(args.load_csv)
+        else:
+            if not data_file.exists():
+                print(f"Error: Data file not found: {data_file}")
+                return 1
+
+            print(f"Loading DDI data from: {data_file}")
+            print(f"Connecting to: {args.uri}")
 
-        print(f"Loading DDI data from: {data_file}")
-        print(f"Connecting to: {args.uri}")
+            # Only the uniqueness constraint up front; name indexes wait for the data
+            loader.create_uniqueness_constraints()
 
-        # Create constraints first
-        loader.create_constraints()
+            # Load data
+            drug_count, interaction_count = loader.load_drugs_and_interactions(
+                data_file, workers=args.workers, update_types=args.update_types,
+                undirected=args.undirected,
+            )
+            print(f"\nLoaded {drug_count} drugs and {interaction_count} interactions")
 
-        # Load data
-        drug_count, interaction_count = loader.load_drugs_and_interactions(data_file)
-        print(f"\nLoaded {drug_count} drugs and {interaction_count} interactions")
+        # Build name indexes over the loaded data
+        loader.create_secondary_indexes()
 
         # Verify
         drug_count, interaction_count, top_types = loader.verify_load()
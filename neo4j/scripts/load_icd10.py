@@ -14,234 +14,351 @@ File format (fixed-width):
 
 Usage:
     python load_icd10.py --uri bolt://localhost:7687 --user neo4j --password <password>
+
+Bulk mode (empty database, Neo4j stopped) writes CSVs and runs neo4j-admin import:
+    python load_icd10.py --bulk --bulk-dir /tmp/icd10
+    # start Neo4j, then:
+    python load_icd10.py --password <password> --constraints-only
 """
 
 import os
+import csv
 import argparse
+import subprocess
 from pathlib import Path
 from typing import Generator
+import numpy as np
 from neo4j import GraphDatabase
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
-def parse_icd10_line(line: str) -> dict | None:
-    """Parse a single line from icd10cm_order file."""
-    if len(line) < 20:
-        return None
+# Bulk-load statements; only the parameters change between batches, so the
+# server plans each statement once
+CYPHER_UPSERT_ICD10 = """
+    UNWIND $codes AS c
+    MERGE (i:ICD10 {code: c.code})
+    ON CREATE SET
+        i.short_desc = c.short_desc,
+        i.long_desc = c.long_desc,
+        i.billable = c.billable,
+        i.chapter = c.chapter
+    ON MATCH SET
+        i.short_desc = c.short_desc,
+        i.long_desc = c.long_desc,
+        i.billable = c.billable,
+        i.chapter = c.chapter
+"""
 
-    try:
-        # Fixed-width parsing
-        code = line[6:14].strip()
-        billable = line[14:15].strip() == '1'
-        short_desc = line[16:77].strip()
-        long_desc = line[77:].strip() if len(line) > 77 else short_desc
+# Server commits every 10k edges, so a large parameter list never becomes one
+# big transaction (needs an auto-commit query, i.e. session.run)
+CYPHER_CREATE_HIERARCHY = """
+    UNWIND $pairs AS p
+    CALL {
+        WITH p
+        MATCH (child:ICD10 {code: p.c})
+        MATCH (parent:ICD10 {code: p.p})
+        MERGE (child)-[:IS_CHILD_OF]->(parent)
+        RETURN 1 AS created
+    } IN TRANSACTIONS OF 10000 ROWS
+    RETURN count(created) AS relationships_created
+"""
 
-        if not code:
-            return None
+# Empty-database variant: every edge is new, so skip MERGE's existence check.
+# Callers must pass each (child, parent) pair only once.
+CYPHER_CREATE_HIERARCHY_FRESH = """
+    UNWIND $pairs AS p
+    CALL {
+        WITH p
+        MATCH (child:ICD10 {code: p.c})
+        MATCH (parent:ICD10 {code: p.p})
+        CREATE (child)-[:IS_CHILD_OF]->(parent)
+        RETURN 1 AS created
+    } IN TRANSACTIONS OF 10000 ROWS
+    RETURN count(created) AS relationships_created
+"""
 
-        # Extract chapter (first character for letter codes)
-        chapter = code[0] if code[0].isalpha() else None
 
-        return {
-            'code': code,
-            'billable': billable,
-            'short_desc': short_desc,
-            'long_desc': long_desc,
-            'chapter': chapter
-        }
-    except Exception:
-        return None
+def _fixed_width_field(cells: np.ndarray, start: int, stop: int) -> np.ndarray:
+    """Columns [start, stop) of every line as a stripped bytes array."""
+    column = np.ascontiguousarray(cells[:, start:stop]).view(f"S{stop - start}").ravel()
+    return np.char.strip(column)
 
 
-def get_parent_code(code: str) -> str | None:
+def parent_codes(codes: np.ndarray) -> np.ndarray:
     """
-    Get parent code for ICD-10 hierarchy.
+    Parent code of every code in a bytes array (b'' where a code has no parent).
 
     Examples:
     - I10.1 -> I10
-    - I10 -> I (chapter)
+    - I10 -> I1
     - A000 -> A00
-    - A00 -> A0
     - A0 -> A
-    - A -> None (top level)
+    - A -> b'' (top level)
     """
-    if not code:
-        return None
+    width = codes.dtype.itemsize
+    trimmed = codes.copy()
+    cells = trimmed.view(np.uint8).reshape(len(codes), width)
+    # Cut at the last dot if there is one, otherwise drop the last character;
+    # zeroing the raw bytes from that column on truncates each code in place
+    dots = np.char.rfind(codes, b'.')
+    cut = np.where(dots >= 0, dots, np.char.str_len(codes) - 1)
+    cells[np.arange(width) >= cut[:, None]] = 0
+    return trimmed
 
-    # If has decimal, remove last part after decimal
-    if '.' in code:
-        return code.rsplit('.', 1)[0]
 
-    # If length > 1, remove last character
-    if len(code) > 1:
-        return code[:-1]
-
-    # Single character = top level, no parent
-    return None
+def read_icd10_file(file_path: Path, batch_size: int = 5000) -> Generator[list, None, None]:
+    """
+    Read ICD-10 file in batches.
 
+    The whole file is parsed column-wise: lines are packed into a fixed-width
+    byte matrix and each field is sliced out for all rows at once, instead of
+    parsing line by line.
+    """
+    raw = [line for line in file_path.read_bytes().splitlines() if len(line) >= 20]
+    if not raw:
+        return
+    width = max(78, max(map(len, raw)))
+    cells = np.array(raw, dtype=f"S{width}").view(np.uint8).reshape(len(raw), width)
+
+    codes = _fixed_width_field(cells, 6, 14)
+    billable = cells[:, 14] == ord('1')
+    short_desc = _fixed_width_field(cells, 16, 77)
+    long_desc = _fixed_width_field(cells, 77, width)
+    # Lines that stop before the long-description column reuse the short one
+    line_len = np.fromiter(map(len, raw), dtype=np.int64, count=len(raw))
+    long_desc = np.where(line_len >= 77, long_desc, short_desc)
+    first = cells[:, 6]
+    is_letter = (first >= ord('A')) & (first <= ord('Z'))
+    chapter = np.where(is_letter, _fixed_width_field(cells, 6, 7), b"")
+
+    keep = np.char.str_len(codes) > 0
+    codes, billable, short_desc, long_desc, chapter = (
+        codes[keep], billable[keep], short_desc[keep], long_desc[keep], chapter[keep]
+    )
+    parents = parent_codes(codes)
+
+    for start in range(0, len(codes), batch_size):
+        stop = start + batch_size
+        yield [
+            {
+                'code': code,
+                'billable': is_billable,
+                'short_desc': short,
+                'long_desc': long,
+                'chapter': ch or None,
+                'parent': parent or None
+            }
+            for code, is_billable, short, long, ch, parent in zip(
+                np.char.decode(codes[start:stop], 'utf-8', 'replace').tolist(),
+                billable[start:stop].tolist(),
+                np.char.decode(short_desc[start:stop], 'utf-8', 'replace').tolist(),
+                np.char.decode(long_desc[start:stop], 'utf-8', 'replace').tolist(),
+                np.char.decode(chapter[start:stop], 'utf-8', 'replace').tolist(),
+                np.char.decode(parents[start:stop], 'utf-8', 'replace').tolist(),
+            )
+        ]
+
+
+def write_bulk_csv(file_path: Path, out_dir: Path) -> tuple[Path, Path, int, int]:
+    """
+    Stage ICD-10 codes as neo4j-admin import CSVs.
 
-def read_icd10_file(file_path: Path, batch_size: int = 5000) -> Generator[list, None, None]:
-    """Read ICD-10 file in batches."""
-    batch = []
-    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-        for line in f:
-            parsed = parse_icd10_line(line)
-            if parsed:
-                batch.append(parsed)
-                if len(batch) >= batch_size:
-                    yield batch
-                    batch = []
-        if batch:
-            yield batch
+    Returns (nodes_csv, rels_csv, total_codes, billable_codes). Edges are only
+    written when the parent code exists, since the importer rejects dangling ends.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    nodes_csv = out_dir / "icd10_nodes.csv"
+    rels_csv = out_dir / "icd10_rels.csv"
+
+    codes = set()
+    edges = []
+    total_codes = 0
+    billable_codes = 0
+    with open(nodes_csv, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["code:ID(ICD10)", "short_desc", "long_desc", "billable:boolean", "chapter"])
+        for batch in read_icd10_file(file_path):
+            for c in batch:
+                writer.writerow([
+                    c['code'], c['short_desc'], c['long_desc'],
+                    "true" if c['billable'] else "false", c['chapter'] or "",
+                ])
+                codes.add(c['code'])
+                if c['parent']:
+                    edges.append((c['code'], c['parent']))
+                billable_codes += c['billable']
+            total_codes += len(batch)
+
+    with open(rels_csv, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow([":START_ID(ICD10)", ":END_ID(ICD10)", ":TYPE"])
+        for code, parent in edges:
+            if parent in codes:
+                writer.writerow([code, parent, "IS_CHILD_OF"])
+
+    return nodes_csv, rels_csv, total_codes, billable_codes
+
+
+def run_bulk_import(nodes_csv: Path, rels_csv: Path, database: str = "neo4j",
+                    neo4j_admin: str = "neo4j-admin") -> None:
+    """Build the store offline with neo4j-admin (database must be stopped; overwrites it)."""
+    subprocess.run([
+        neo4j_admin, "database", "import", "full",
+        "--nodes=ICD10=" + str(nodes_csv),
+        "--relationships=IS_CHILD_OF=" + str(rels_csv),
+        "--overwrite-destination",
+        database,
+    ], check=True)
 
 
 class ICD10Loader:
     def __init__(self, uri: str, user: str, password: str):
         self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        # One session for the loader's lifetime; every query below runs on it
+        self._session = self.driver.session()
 
     def close(self):
+        self._session.close()
         self.driver.close()
 
-    def create_constraints(self):
-        """Create constraints and indexes."""
-        with self.driver.session() as session:
-            # Unique constraint on code
-            session.run("""
-                CREATE CONSTRAINT icd10_code IF NOT EXISTS
-                FOR (i:ICD10) REQUIRE i.code IS UNIQUE
-            """)
-
-            # Index on description for search
-            session.run("""
-                CREATE INDEX icd10_short_desc IF NOT EXISTS
-                FOR (i:ICD10) ON (i.short_desc)
-            """)
-
-            # Index on billable flag
-            session.run("""
-                CREATE INDEX icd10_billable IF NOT EXISTS
-                FOR (i:ICD10) ON (i.billable)
-            """)
-
-            # Index on chapter
-            session.run("""
-                CREATE INDEX icd10_chapter IF NOT EXISTS
-                FOR (i:ICD10) ON (i.chapter)
-            """)
-
-            # Full-text index for fuzzy search
-            session.run("""
-                CREATE FULLTEXT INDEX icd10_fulltext IF NOT EXISTS
-                FOR (i:ICD10) ON EACH [i.short_desc, i.long_desc]
-            """)
-
-            print("Created ICD-10 constraints and indexes")
+    def create_uniqueness_constraints(self):
+        """Create the code uniqueness constraint (before loading; MERGE relies on it)."""
+        self._session.run("""
+            CREATE CONSTRAINT icd10_code IF NOT EXISTS
+            FOR (i:ICD10) REQUIRE i.code IS UNIQUE
+        """)
+
+        print("Created ICD-10 uniqueness constraint")
+
+    def create_secondary_indexes(self):
+        """Create search indexes after loading, so they are built once rather than per insert."""
+        # Index on description for search
+        self._session.run("""
+            CREATE INDEX icd10_short_desc IF NOT EXISTS
+            FOR (i:ICD10) ON (i.short_desc)
+        """)
+
+        # Index on billable flag
+        self._session.run("""
+            CREATE INDEX icd10_billable IF NOT EXISTS
+            FOR (i:ICD10) ON (i.billable)
+        """)
+
+        # Index on chapter
+        self._session.run("""
+            CREATE INDEX icd10_chapter IF NOT EXISTS
+            FOR (i:ICD10) ON (i.chapter)
+        """)
+
+        # Full-text index for fuzzy search
+        self._session.run("""
+            CREATE FULLTEXT INDEX icd10_fulltext IF NOT EXISTS
+            FOR (i:ICD10) ON EACH [i.short_desc, i.long_desc]
+        """)
+
+        # Index population is asynchronous; block until they are ONLINE
+        self._session.run("CALL db.awaitIndexes(600)").consume()
+
+        print("Created ICD-10 secondary indexes")
 
     def load_codes(self, file_path: Path) -> tuple[int, int]:
         """Load ICD-10 codes from file."""
         total_codes = 0
         billable_codes = 0
 
-        with self.driver.session() as session:
-            for batch_num, batch in enumerate(read_icd10_file(file_path)):
-                # Create ICD10 nodes
-                session.run("""
-                    UNWIND $codes AS c
-                    MERGE (i:ICD10 {code: c.code})
-                    ON CREATE SET
-                        i.short_desc = c.short_desc,
-                        i.long_desc = c.long_desc,
-                        i.billable = c.billable,
-                        i.chapter = c.chapter
-                    ON MATCH SET
-                        i.short_desc = c.short_desc,
-                        i.long_desc = c.long_desc,
-                        i.billable = c.billable,
-                        i.chapter = c.chapter
-                """, codes=batch)
-
-                total_codes += len(batch)
-                billable_codes += sum(1 for c in batch if c['billable'])
-
-                print(f"Batch {batch_num + 1}: Loaded {len(batch)} codes (running total: {total_codes})")
+        for batch_num, batch in enumerate(read_icd10_file(file_path)):
+            # Create ICD10 nodes
+            self._session.run(CYPHER_UPSERT_ICD10, codes=batch).consume()
+
+            total_codes += len(batch)
+            billable_codes += sum(1 for c in batch if c['billable'])
+
+            print(f"Batch {batch_num + 1}: Loaded {len(batch)} codes (running total: {total_codes})")
 
         return total_codes, billable_codes
 
-    def create_hierarchy(self):
-        """Create IS_CHILD_OF relationships based on code structure."""
-        with self.driver.session() as session:
-            # This query finds parent-child relationships
-            # A code's parent is derived by removing the last character (or decimal part)
-            result = session.run("""
-                MATCH (child:ICD10)
-                WHERE size(child.code) > 1
-                WITH child,
-                     CASE
-                         WHEN child.code CONTAINS '.'
-                         THEN substring(child.code, 0, size(child.code) -
-                              size(split(child.code, '.')[-1]) - 1)
-                         ELSE substring(child.code, 0, size(child.code) - 1)
-                     END AS parent_code
-                MATCH (parent:ICD10 {code: parent_code})
-                MERGE (child)-[:IS_CHILD_OF]->(parent)
-                RETURN count(*) AS relationships_created
-            """)
-
-            count = result.single()["relationships_created"]
-            print(f"Created {count} IS_CHILD_OF relationships")
-            return count
+    def _merge_edges(self, pairs: list[dict], fresh: bool = False) -> int:
+        """MERGE (or CREATE, if fresh) one batch of {c: child, p: parent} edges; returns rows matched."""
+        query = CYPHER_CREATE_HIERARCHY_FRESH if fresh else CYPHER_CREATE_HIERARCHY
+        result = self._session.run(query, pairs=pairs)
+        return result.single()["relationships_created"]
+
+    def create_hierarchy(self, file_path: Path, batch_size: int = 50000, fresh: bool = False) -> int:
+        """
+        Create IS_CHILD_OF relationships from the parent codes read_icd10_file computes.
+
+        fresh=True uses CREATE instead of MERGE and is only safe on a database
+        with no existing IS_CHILD_OF edges; pairs are deduplicated here instead.
+        """
+        count = 0
+        pairs = []
+        seen = set()
+        for batch in read_icd10_file(file_path):
+            for c in batch:
+                if c['parent']:
+                    if fresh:
+                        edge = (c['code'], c['parent'])
+                        if edge in seen:
+                            continue
+                        seen.add(edge)
+                    pairs.append({'c': c['code'], 'p': c['parent']})
+            if len(pairs) >= batch_size:
+                count += self._merge_edges(pairs, fresh)
+                pairs.clear()
+        if pairs:
+            count += self._merge_edges(pairs, fresh)
+
+        print(f"Created {count} IS_CHILD_OF relationships")
+        return count
 
     def verify_load(self) -> dict:
         """Verify the data was loaded correctly."""
-        with self.driver.session() as session:
-            result = session.run("""
-                MATCH (i:ICD10)
-                RETURN
-                    count(i) AS total_codes,
-                    sum(CASE WHEN i.billable THEN 1 ELSE 0 END) AS billable_codes,
-                    count(DISTINCT i.chapter) AS chapters
-            """)
-            stats = result.single()
-
-            # Count relationships
-            rel_result = session.run("""
-                MATCH ()-[r:IS_CHILD_OF]->()
-                RETURN count(r) AS hierarchy_relationships
-            """)
-            rel_count = rel_result.single()["hierarchy_relationships"]
-
-            return {
-                "total_codes": stats["total_codes"],
-                "billable_codes": stats["billable_codes"],
-                "chapters": stats["chapters"],
-                "hierarchy_relationships": rel_count
-            }
+        result = self._session.run("""
+            MATCH (i:ICD10)
+            RETURN
+                count(i) AS total_codes,
+                sum(CASE WHEN i.billable THEN 1 ELSE 0 END) AS billable_codes,
+                count(DISTINCT i.chapter) AS chapters
+        """)
+        stats = result.single()
+
+        # Count relationships
+        rel_result = self._session.run("""
+            MATCH ()-[r:IS_CHILD_OF]->()
+            RETURN count(r) AS hierarchy_relationships
+        """)
+        rel_count = rel_result.single()["hierarchy_relationships"]
+
+        return {
+            "total_codes": stats["total_codes"],
+            "billable_codes": stats["billable_codes"],
+            "chapters": stats["chapters"],
+            "hierarchy_relationships": rel_count
+        }
 
     def search_codes(self, search_term: str, limit: int = 10) -> list:
         """Search for ICD-10 codes by description."""
-        with self.driver.session() as session:
-            result = session.run("""
-                CALL db.index.fulltext.queryNodes("icd10_fulltext", $term)
-                YIELD node, score
-                WHERE node.billable = true
-                RETURN node.code AS code, node.short_desc AS description, score
-                ORDER BY score DESC
-                LIMIT $limit
-            """, term=search_term, limit=limit)
-            return list(result)
+        result = self._session.run("""
+            CALL db.index.fulltext.queryNodes("icd10_fulltext", $term)
+            YIELD node, score
+            WHERE node.billable = true
+            RETURN node.code AS code, node.short_desc AS description, score
+            ORDER BY score DESC
+            LIMIT $limit
+        """, term=search_term, limit=limit)
+        return list(result)
 
     def get_code_with_parents(self, code: str) -> list:
         """Get a code and all its parents in the hierarchy."""
-        with self.driver.session() as session:
-            result = session.run("""
-                MATCH path = (child:ICD10 {code: $code})-[:IS_CHILD_OF*0..10]->(ancestor:ICD10)
-                RETURN ancestor.code AS code, ancestor.short_desc AS description,
-                       ancestor.billable AS billable, length(path) AS depth
-                ORDER BY depth
-            """, code=code)
-            return list(result)
+        result = self._session.run("""
+            MATCH path = (child:ICD10 {code: $code})-[:IS_CHILD_OF*0..10]->(ancestor:ICD10)
+            RETURN ancestor.code AS code, ancestor.short_desc AS description,
+                   ancestor.billable AS billable, length(path) AS depth
+            ORDER BY depth
+        """, code=code)
+        return list(result)
 
 
 def main():
@@ -253,21 +370,47 @@ def main():
     parser.add_argument("--verify-only", action="store_true")
     parser.add_argument("--search", help="Search for ICD-10 codes")
     parser.add_argument("--hierarchy", help="Show hierarchy for a code")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Offline import via neo4j-admin (fresh database, Neo4j stopped)")
+    parser.add_argument("--bulk-dir", default="icd10_import", help="Where to stage the bulk CSVs")
+    parser.add_argument("--database", default="neo4j", help="Target database for --bulk")
+    parser.add_argument("--neo4j-admin", default="neo4j-admin", help="Path to the neo4j-admin binary")
+    parser.add_argument("--constraints-only", action="store_true",
+                        help="Only create constraints and indexes (run after --bulk)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Empty database: CREATE hierarchy edges instead of MERGE")
     args = parser.parse_args()
 
-    if not args.password:
-        print("Error: Neo4j password required. Set NEO4J_PASSWORD env var or use --password")
-        return 1
-
     # Default data file path
     if args.data_file:
         data_file = Path(args.data_file)
     else:
         data_file = Path(__file__).parent.parent.parent / "data" / "ICD-10-CM" / "Code Descriptions" / "icd10cm_order_2026.txt"
 
+    if args.bulk:
+        # No Bolt connection: neo4j-admin writes the store files directly
+        if not data_file.exists():
+            print(f"Error: Data file not found: {data_file}")
+            return 1
+        print(f"Staging ICD-10-CM CSVs from: {data_file}")
+        nodes_csv, rels_csv, total, billable = write_bulk_csv(data_file, Path(args.bulk_dir))
+        print(f"Wrote {total} codes ({billable} billable) to {nodes_csv.parent}")
+        run_bulk_import(nodes_csv, rels_csv, args.database, args.neo4j_admin)
+        print("\nImport complete. Start Neo4j, then run with --constraints-only to build indexes.")
+        return 0
+
+    if not args.password:
+        print("Error: Neo4j password required. Set NEO4J_PASSWORD env var or use --password")
+        return 1
+
     loader = ICD10Loader(args.uri, args.user, args.password)
 
     try:
+        if args.constraints_only:
+            loader.create_uniqueness_constraints()
+            loader.create_secondary_indexes()
+            return 0
+
         if args.search:
             print(f"\nSearching for: {args.search}")
             results = loader.search_codes(args.search)
@@ -300,15 +443,18 @@ def main():
         print(f"Loading ICD-10-CM data from: {data_file}")
         print(f"Connecting to: {args.uri}")
 
-        # Create constraints
-        loader.create_constraints()
+        # Only the uniqueness constraint up front; search indexes wait for the data
+        loader.create_uniqueness_constraints()
 
         # Load codes
         total, billable = loader.load_codes(data_file)
         print(f"\nLoaded {total} codes ({billable} billable)")
 
         # Create hierarchy
-        loader.create_hierarchy()
+        loader.create_hierarchy(data_file, fresh=args.fresh)
+
+        # Build search indexes over the loaded data
+        loader.create_secondary_indexes()
 
         # Verify
         stats = loader.verify_load()